@@ -25,3 +25,33 @@ export async function fetchWithRetry(url: string, options: RequestInit, attempts
   }
   throw new Error("The LLM is currently unavailable, Please try again after some time.");
 }
+
+/**
+ * Reads a backend SSE stream (`data: {"token": "..."}` frames ending in `data: [DONE]`)
+ * and calls onText with the accumulated text after each network chunk.
+ */
+export async function readSseText(response: Response, onText: (text: string) => void): Promise<string> {
+  const reader = response.body?.getReader();
+  const decoder = new TextDecoder();
+  let acc = "";
+  let buffer = "";
+  let finished = false;
+  while (reader && !finished) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const frames = buffer.split("\n\n");
+    buffer = frames.pop() ?? "";
+    for (const frame of frames) {
+      if (!frame.startsWith("data: ")) continue;
+      const payload = frame.slice(6);
+      if (payload === "[DONE]") {
+        finished = true;
+        break;
+      }
+      acc += JSON.parse(payload).token;
+    }
+    onText(acc);
+  }
+  return acc;
+}
@@ -19,7 +19,7 @@ import {
 } from 'lucide-react';
 import { useLocation, useParams, useNavigate } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
-import { fetchWithRetry } from '../lib/apiUtils';
+import { fetchWithRetry, readSseText } from '../lib/apiUtils';
 
 export default function VideoPlayer() {
   const { id } = useParams();
@@ -57,13 +57,16 @@ export default function VideoPlayer() {
     setLoading(prev => ({ ...prev, summary: true }));
     setError(prev => ({ ...prev, summary: undefined }));
     try {
-      const summaryRes = await fetchWithRetry('/api/summarize', {
+      const summaryRes = await fetchWithRetry('/api/summarize/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ transcript_text: transcript }),
       });
-      const sData = await summaryRes.json();
-      setData(prev => ({ ...prev, summary: sData.summary }));
+      // Render the summary as it streams in instead of waiting for the whole generation
+      await readSseText(summaryRes, text => {
+        setData(prev => ({ ...prev, summary: text }));
+        setLoading(prev => ({ ...prev, summary: false }));
+      });
     } catch (err: any) {
       setError(prev => ({ ...prev, summary: err.message || "Summary failed" }));
     } finally {
@@ -84,6 +87,9 @@ export default function VideoPlayer() {
       setData(prev => ({ ...prev, transcript: transcriptData.transcript }));
       setLoading(prev => ({ ...prev, transcript: false }));
 
+      // Start summary fetch; it only needs the transcript, so it runs while ingest proceeds
+      fetchSummary(transcriptData.transcript);
+
       const ingestedVideoId = sessionStorage.getItem('ingested_video_id');
       if (ingestedVideoId === transcriptData.video_id) {
         setLoading(prev => ({ ...prev, rag: false }));
@@ -98,9 +104,6 @@ export default function VideoPlayer() {
         sessionStorage.setItem('ingested_video_id', transcriptData.video_id);
         setLoading(prev => ({ ...prev, rag: false }));
       }
-      
-      // Start summary fetch
-      fetchSummary(transcriptData.transcript);
 
     } catch (err: any) {
       setError(prev => ({ ...prev, pipeline: err.message || "AI pipeline failed." }));
@@ -133,8 +136,6 @@ export default function VideoPlayer() {
         body: JSON.stringify({ video_id: id, query: userQuery }),
       });
 
-      const reader = response.body?.getReader();
-      const decoder = new TextDecoder();
       setIsStreaming(true);
       setLoading(prev => ({ ...prev, chat: false }));
       clearInterval(statusInterval);
@@ -142,17 +143,14 @@ export default function VideoPlayer() {
       setError(prev => ({ ...prev, chat: undefined }));
 
       setMessages(prev => [...prev, { role: 'ai', text: '' }]);
-      let acc = "";
-      while (reader) {
-        const { done, value } = await reader.read();
-        if (done) break;
-        acc += decoder.decode(value, { stream: true });
+      // The answer arrives as SSE frames: `data: {"token": "..."}` ... `data: [DONE]`
+      await readSseText(response, text => {
         setMessages(prev => {
           const newMsgs = [...prev];
-          newMsgs[newMsgs.length - 1].text = acc;
+          newMsgs[newMsgs.length - 1].text = text;
           return newMsgs;
         });
-      }
+      });
     } catch (err: any) {
       clearInterval(statusInterval);
       setError(prev => ({ ...prev, chat: err.message || "Chat error" }));
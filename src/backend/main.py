@@ -1,81 +1,58 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import sys
 import os
 import re
 import asyncio
+import functools
+import logging
+from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
-import httpx
-
-# Monkey patch to fix httpx compatibility issue with youtube-search-python
-# Newer httpx versions don't accept 'proxies' in post()/get() directly
-# MUST be done before importing VideosSearch
-def patch_youtube_search_httpx():
-    """Fix httpx compatibility for youtube-search-python library."""
-    from youtubesearchpython.core.requests import RequestCore
-    from youtubesearchpython.core.constants import userAgent
-    
-    def fixed_sync_post(self):
-        """Fixed syncPostRequest that works with newer httpx versions."""
-        if self.proxy:
-            # Use httpx.Client with proxies for newer httpx versions
-            with httpx.Client(proxies=self.proxy) as client:
-                return client.post(
-                    self.url,
-                    headers={"User-Agent": userAgent},
-                    json=self.data,
-                    timeout=self.timeout
-                )
-        else:
-            return httpx.post(
-                self.url,
-                headers={"User-Agent": userAgent},
-                json=self.data,
-                timeout=self.timeout
-            )
-    
-    def fixed_sync_get(self):
-        """Fixed syncGetRequest that works with newer httpx versions."""
-        if self.proxy:
-            with httpx.Client(proxies=self.proxy) as client:
-                return client.get(
-                    self.url,
-                    headers={"User-Agent": userAgent},
-                    timeout=self.timeout,
-                    cookies={'CONSENT': 'YES+1'}
-                )
-        else:
-            return httpx.get(
-                self.url,
-                headers={"User-Agent": userAgent},
-                timeout=self.timeout,
-                cookies={'CONSENT': 'YES+1'}
-            )
-    
-    # Apply the patch
-    RequestCore.syncPostRequest = fixed_sync_post
-    RequestCore.syncGetRequest = fixed_sync_get
+import orjson
+import aiofiles
+from cachetools import LRUCache
+
+# Add parent directory to path to import existing modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_search_patch import patch_youtube_search_httpx, aclose_async_client
+
+LOG = logging.getLogger(__name__)
 
 # Apply the patch BEFORE importing VideosSearch
 try:
     patch_youtube_search_httpx()
 except Exception as e:
-    print(f"Warning: Could not patch youtube-search-python: {e}")
-
-# Now import VideosSearch after the patch is applied
-from youtubesearchpython import VideosSearch
+    LOG.warning("Could not patch youtube-search-python: %s", e)
 
-# Add parent directory to path to import existing modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Now import VideosSearch after the patch is applied; the __future__ variant is the
+# library's native async API, so searches are awaited instead of parked on a thread.
+from youtubesearchpython.__future__ import VideosSearch
 
-from get_transcripts import gettranscripts
+from get_transcripts import gettranscripts, write_text_atomic, TITLE_TO_FILENAME
 from generate_summary import Summarize
 from rag.rag_workflow import TranscriptRAG
-import traceback
 
-app = FastAPI()
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, which is several times faster than the stdlib encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+# Load the RAG models in the background at startup; set RAG_WARMUP=0 to skip.
+RAG_WARMUP = os.getenv("RAG_WARMUP", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if RAG_WARMUP and transcript_rag is not None:
+        asyncio.get_running_loop().run_in_executor(executor, transcript_rag.warm_up)
+    yield
+    await aclose_async_client()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Setup CORS
 app.add_middleware(
@@ -90,15 +67,84 @@ app.add_middleware(
 try:
     transcript_rag = TranscriptRAG()
 except Exception as e:
-    print(f"ERROR: Failed to initialize TranscriptRAG: {e}")
-    print(traceback.format_exc())
+    LOG.exception("Failed to initialize TranscriptRAG: %s", e)
     transcript_rag = None
 
-# In-memory transcript cache for Pinecone workflow
-transcript_cache = {}
-
-# Thread pool executor for blocking operations
-executor = ThreadPoolExecutor(max_workers=4)
+# In-memory transcript cache for Pinecone workflow, bounded so a long-running server
+# keeps only the most recently used transcripts (the rest stay on disk in TRANSCRIPT_DIR).
+TRANSCRIPT_CACHE_MAX = int(os.getenv("TRANSCRIPT_CACHE_MAX", "256"))
+transcript_cache = LRUCache(maxsize=TRANSCRIPT_CACHE_MAX)
+
+# Recent search results (SEARCH_LIMIT per /search), shared with /recommend; repeated
+# searches skip YouTube.
+from backend.recommendation import search_cache
+SEARCH_LIMIT = 5
+
+# Thread pool executor for blocking RAG work: /chat retrieval and the /ingest and
+# /process-all ingests. The work is network-bound (Pinecone, Ollama, Cohere), so the
+# pool is sized for I/O, not for CPUs.
+EXECUTOR_WORKERS = int(os.getenv("YT_EXECUTOR_WORKERS", "32"))
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="yt-io")
+
+# Upper bound on transcript text accepted in request bodies; anything larger is
+# rejected with a 422 before it reaches the LLM services.
+MAX_TRANSCRIPT_CHARS = int(os.getenv("MAX_TRANSCRIPT_CHARS", "500000"))
+
+# Raw transcripts persisted per video_id, so /chat can recover one after a restart
+# with a single file read instead of scanning the directory. Kept apart from the
+# title-named copies in transcripts/, where a title could match another video's ID.
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", os.path.join("transcripts", "by_id"))
+VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{11}")
+
+def transcript_store_path(video_id: str) -> str:
+    return os.path.join(TRANSCRIPT_DIR, f"{video_id}.txt")
+
+async def store_transcript(video_id: str, transcript_text: str) -> None:
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    await write_text_atomic(transcript_store_path(video_id), transcript_text)
+
+async def load_transcript(video_id: str) -> str:
+    """Transcript for video_id from the in-memory cache, falling back to the on-disk store."""
+    transcript_text = transcript_cache.get(video_id)
+    if transcript_text:
+        return transcript_text
+    # Only well-formed YouTube IDs are looked up, which also keeps the path inside TRANSCRIPT_DIR
+    if not VIDEO_ID_RE.fullmatch(video_id):
+        return ""
+    try:
+        async with aiofiles.open(transcript_store_path(video_id), "r", encoding="utf-8") as f:
+            transcript_text = await f.read()
+    except FileNotFoundError:
+        return ""
+    transcript_cache[video_id] = transcript_text
+    return transcript_text
+
+def sse_frames(tokens):
+    """Wraps a token generator as server-sent events: one `data: {"token": ...}` frame per token, then `data: [DONE]`."""
+    for token in tokens:
+        if token:
+            yield b"data: " + orjson.dumps({"token": token}) + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
+async def async_sse_frames(tokens):
+    """sse_frames for async token generators."""
+    async for token in tokens:
+        if token:
+            yield b"data: " + orjson.dumps({"token": token}) + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
+def resolve_transcript_text(transcript_text: str, video_id: str) -> str:
+    """Prefer the transcript cached by /transcript over text re-sent by the client."""
+    if video_id:
+        cached = transcript_cache.get(video_id)
+        if cached:
+            return cached
+    if not transcript_text:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide transcript_text or the video_id of a transcript fetched via /transcript"
+        )
+    return transcript_text
 
 class SearchRequest(BaseModel):
     query: str
@@ -108,7 +154,8 @@ class TranscriptRequest(BaseModel):
     title: str
 
 class SummaryRequest(BaseModel):
-    transcript_text: str
+    transcript_text: str = Field("", max_length=MAX_TRANSCRIPT_CHARS)
+    video_id: str = ""
 
 class RecommendRequest(BaseModel):
     transcript_text: str
@@ -122,19 +169,16 @@ async def search_videos(request: SearchRequest):
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
         query = request.query.strip()
+        cache_key = (query.lower(), SEARCH_LIMIT)
+        cached_results = search_cache.get(cache_key)
+        if cached_results is not None:
+            return ORJSONResponse({"results": cached_results})
         
-        # Run blocking search operation in thread pool to avoid blocking async event loop
-        def perform_search():
-            try:
-                search = VideosSearch(query, limit=5)
-                return search.result()
-            except Exception as e:
-                print(f"VideosSearch error: {e}")
-                raise
-        
-        # Execute search in thread pool
-        loop = asyncio.get_event_loop()
-        search_result = await loop.run_in_executor(executor, perform_search)
+        try:
+            search_result = await VideosSearch(query, limit=SEARCH_LIMIT).next()
+        except Exception as e:
+            LOG.warning("VideosSearch error: %s", e)
+            raise
         
         # Validate result structure
         if not search_result:
@@ -145,7 +189,7 @@ async def search_videos(request: SearchRequest):
         
         if "result" not in search_result:
             # Log the actual response for debugging
-            print(f"Unexpected search result structure: {search_result}")
+            LOG.warning("Unexpected search result structure: %s", search_result)
             raise HTTPException(
                 status_code=500, 
                 detail="Invalid response format from YouTube search"
@@ -155,16 +199,18 @@ async def search_videos(request: SearchRequest):
         
         # Ensure results is a list
         if not isinstance(results, list):
-            print(f"Results is not a list, type: {type(results)}, value: {results}")
+            LOG.warning("Results is not a list, type: %s, value: %s", type(results), results)
             results = []
         
-        return {"results": results}
+        search_cache[cache_key] = results
+        # Returning the response directly skips FastAPI's jsonable_encoder walk
+        # over the deeply nested YouTube result dicts.
+        return ORJSONResponse({"results": results})
     except HTTPException:
         raise
     except Exception as e:
         error_msg = str(e)
-        print(f"Search error: {error_msg}")
-        print(traceback.format_exc())
+        LOG.exception("Search error: %s", error_msg)
         raise HTTPException(status_code=500, detail=f"Search failed: {error_msg}")
 
 class IngestRequest(BaseModel):
@@ -175,16 +221,25 @@ class IngestRequest(BaseModel):
 async def get_transcript(request: TranscriptRequest):
     try:
         video_id = gettranscripts.extract_video_id(request.video_url)
-        transcript = gettranscripts.get_transcript(video_id)
+        # Reopening a video is served from the cache / on-disk store without calling YouTube
+        transcript_text = await load_transcript(video_id)
+        if transcript_text:
+            return {"transcript": transcript_text, "video_id": video_id}
+
+        # The transcript fetch is a blocking HTTP call; keep it off the event loop
+        transcript = await asyncio.to_thread(gettranscripts.get_transcript, video_id)
         transcript_text = gettranscripts.format_transcript(transcript)
         
-        # Save transcript locally as per original logic (optional, but good for caching/debugging)
-        file_path = f"{request.title.replace(' ', '_').replace('?', '').replace('|', '')}.txt"
-        gettranscripts.save_transcript(request.title, transcript_text, file_path)
-        
         # Store transcript in cache for Pinecone workflow
         transcript_cache[video_id] = transcript_text
         
+        # Save the titled copy (as per original logic) and the per-video_id copy concurrently
+        file_path = f"{request.title.translate(TITLE_TO_FILENAME)}.txt"
+        await asyncio.gather(
+            gettranscripts.asave_transcript(request.title, transcript_text, file_path),
+            store_transcript(video_id, transcript_text),
+        )
+        
         return {"transcript": transcript_text, "video_id": video_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -196,82 +251,118 @@ async def ingest_transcript(request: IngestRequest):
         if transcript_rag is None:
             raise HTTPException(status_code=503, detail="TranscriptRAG not initialized")
             
-        transcript_rag.create_transcript_index(request.video_id)
-        transcript_rag.ingest_transcript(request.transcript_text, request.video_id, strategy="agentic")
+        # Index creation and embed+upsert are blocking network work; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, transcript_rag.create_transcript_index, request.video_id)
+        await loop.run_in_executor(
+            executor,
+            functools.partial(transcript_rag.ingest_transcript, request.transcript_text, request.video_id, strategy="agentic")
+        )
         
         return {"status": "success", "message": "Ingestion complete"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Ingestion error: {e}")
-        print(traceback.format_exc())
+        LOG.exception("Ingestion error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/summarize")
 async def summarize_transcript(request: SummaryRequest):
+    transcript_text = resolve_transcript_text(request.transcript_text, request.video_id)
     try:
-        loop = asyncio.get_event_loop()
-        summary = await loop.run_in_executor(executor, Summarize.summarize_topic, request.transcript_text)
+        summary = await Summarize.summarize_topic(transcript_text)
         return {"summary": summary}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/summarize/stream")
+async def stream_summary(request: SummaryRequest):
+    """Streams the summary as SSE frames while the LLM generates it."""
+    transcript_text = resolve_transcript_text(request.transcript_text, request.video_id)
+    return StreamingResponse(
+        async_sse_frames(Summarize.stream_summary(transcript_text)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 from mcq_service import MCQService
 from backend.recommendation import get_recommendations
 from backend.mindMap import MindMapService
 
+def mcq_questions(mcq_data) -> list:
+    """The question list from generate_mcqs_from_text, which may return a bare list instead of {"questions": [...]}."""
+    if isinstance(mcq_data, dict):
+        return mcq_data.get("questions", [])
+    return mcq_data if isinstance(mcq_data, list) else []
+
 class MCQRequest(BaseModel):
-    transcript_text: str
+    transcript_text: str = Field("", max_length=MAX_TRANSCRIPT_CHARS)
+    video_id: str = ""
 
 class GradeRequest(BaseModel):
-    transcript_text: str
+    transcript_text: str = Field("", max_length=MAX_TRANSCRIPT_CHARS)
+    video_id: str = ""
     questions: list
     user_answers: dict
 
 @app.post("/generate-mcq")
 async def generate_mcq(request: MCQRequest):
+    transcript_text = resolve_transcript_text(request.transcript_text, request.video_id)
     try:
         if transcript_rag is None:
             raise HTTPException(status_code=503, detail="RAG service not initialized")
-        loop = asyncio.get_event_loop()
-        mcq_data = await loop.run_in_executor(
-            executor, 
-            MCQService.generate_mcqs_from_text, 
-            request.transcript_text, 
+        mcq_data = await MCQService.generate_mcqs_from_text(
+            transcript_text, 
             transcript_rag.llm
         )
         return mcq_data
     except Exception as e:
-        print(f"MCQ Generation error: {e}")
-        print(traceback.format_exc())
+        LOG.exception("MCQ Generation error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/analyze")
+async def analyze_transcript(request: SummaryRequest):
+    """Generate the summary and MCQs for a transcript concurrently."""
+    transcript_text = resolve_transcript_text(request.transcript_text, request.video_id)
+    try:
+        if transcript_rag is None:
+            raise HTTPException(status_code=503, detail="RAG service not initialized")
+        summary, mcq_data = await asyncio.gather(
+            Summarize.summarize_topic(transcript_text),
+            MCQService.generate_mcqs_from_text(transcript_text, transcript_rag.llm)
+        )
+        mcqs = mcq_questions(mcq_data)
+        return {"summary": summary, "mcqs": mcqs}
+    except HTTPException:
+        raise
+    except Exception as e:
+        LOG.exception("Analyze error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/grade-mcq")
 async def grade_mcq(request: GradeRequest):
+    transcript_text = resolve_transcript_text(request.transcript_text, request.video_id)
     try:
         if transcript_rag is None:
             raise HTTPException(status_code=503, detail="RAG service not initialized")
-        loop = asyncio.get_event_loop()
-        grading_result = await loop.run_in_executor(
-            executor,
-            MCQService.grade_mcq_answers,
-            request.transcript_text, 
+        grading_result = await MCQService.grade_mcq_answers(
+            transcript_text, 
             request.questions, 
             request.user_answers,
             transcript_rag.llm
         )
         return grading_result
     except Exception as e:
-        print(f"MCQ Grading error: {e}")
-        print(traceback.format_exc())
+        LOG.exception("MCQ Grading error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/recommend")
 async def recommend_literature(request: RecommendRequest):
-    return {"recommendations": await get_recommendations(
+    return ORJSONResponse({"recommendations": await get_recommendations(
         request.transcript_text, 
         request.summary, 
-        transcript_rag, 
-        executor
-    )}
+        transcript_rag
+    )})
 
 class MindMapRequest(BaseModel):
     transcript_text: str
@@ -281,17 +372,10 @@ async def generate_mind_map(request: MindMapRequest):
     try:
         if transcript_rag is None:
             raise HTTPException(status_code=503, detail="RAG service not initialized")
-        loop = asyncio.get_event_loop()
-        mind_map_code = await loop.run_in_executor(
-            executor, 
-            MindMapService.generate_mind_map, 
-            request.transcript_text, 
-            transcript_rag.llm
-        )
+        mind_map_code = await MindMapService.generate_mind_map(request.transcript_text, transcript_rag.llm)
         return {"mind_map": mind_map_code}
     except Exception as e:
-        print(f"Mind Map Generation error: {e}")
-        print(traceback.format_exc())
+        LOG.exception("Mind Map Generation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 class ChatRequest(BaseModel):
@@ -302,25 +386,8 @@ class ChatRequest(BaseModel):
 async def chat_with_video(request: ChatRequest):
     """Chat with video using RAG workflow with Pinecone."""
     try:
-        # Retrieve transcript text from cache
-        transcript_text = transcript_cache.get(request.video_id)
-        
-        if not transcript_text:
-            # Fallback: try to retrieve from saved file
-            import glob
-            import os
-            transcript_files = glob.glob("transcripts/*.txt")
-            for file_path in transcript_files:
-                # Try to match by reading file and checking if it contains the video_id
-                # or by filename if video_id is in filename
-                if request.video_id in os.path.basename(file_path):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-                        if len(lines) > 2:
-                            transcript_text = ''.join(lines[2:]).strip()
-                            # Cache it for future use
-                            transcript_cache[request.video_id] = transcript_text
-                            break
+        # Retrieve transcript text from cache (or the on-disk store after a restart)
+        transcript_text = await load_transcript(request.video_id)
         
         if not transcript_text:
             raise HTTPException(
@@ -341,29 +408,35 @@ async def chat_with_video(request: ChatRequest):
         # 3. Generate answer from top 5 reranked chunks
         try:
             # 1. Get the generator from your RAG service
-            # We assume query_transcript now yields text chunks
-            answer_generator = transcript_rag.query_transcript(
-                transcript_id=request.video_id,
-                query=request.query,
-                use_reranker=True,
-                stream=True
+            # Retrieval + reranking are blocking, so run them in the thread pool;
+            # the returned generator is then iterated by StreamingResponse.
+            loop = asyncio.get_running_loop()
+            answer_generator = await loop.run_in_executor(
+                executor,
+                functools.partial(
+                    transcript_rag.query_transcript,
+                    transcript_id=request.video_id,
+                    query=request.query,
+                    use_reranker=True,
+                    stream=True
+                )
             )
 
             # 2. Return the StreamingResponse immediately
             # media_type "text/event-stream" is standard for LLM streaming
             return StreamingResponse(
-                answer_generator, 
+                sse_frames(answer_generator), 
                 media_type="text/event-stream",
                 headers={
                     "X-Context-Used": "5",  # Send metadata in headers
-                    "Cache-Control": "no-cache"
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no"  # Stop reverse proxies from buffering the stream
                 }
             )
 
         except Exception as e:
             error_msg = str(e)
-            print(f"Generation error: {error_msg}")
-            print(traceback.format_exc())
+            LOG.exception("Generation error: %s", error_msg)
             # For streaming, you might want to return a JSON error 
             # or a stream that contains the error message
             raise HTTPException(status_code=500, detail=f"Error processing query: {error_msg}")
@@ -381,14 +454,14 @@ async def process_all(request: MindMapRequest):
         if transcript_rag is None:
             raise HTTPException(status_code=503, detail="RAG service not initialized")
             
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         
         # 1. Start all tasks concurrently
         ingest_task = loop.run_in_executor(executor, transcript_rag.ingest_transcript, request.transcript_text, "temp_vid", "agentic")
-        summary_task = loop.run_in_executor(executor, Summarize.summarize_topic, request.transcript_text)
-        mcq_task = loop.run_in_executor(executor, MCQService.generate_mcqs_from_text, request.transcript_text, transcript_rag.llm)
-        mindmap_task = loop.run_in_executor(executor, MindMapService.generate_mind_map, request.transcript_text, transcript_rag.llm)
-        recommend_task = get_recommendations(request.transcript_text, "", transcript_rag, executor)
+        summary_task = Summarize.summarize_topic(request.transcript_text)
+        mcq_task = MCQService.generate_mcqs_from_text(request.transcript_text, transcript_rag.llm)
+        mindmap_task = MindMapService.generate_mind_map(request.transcript_text, transcript_rag.llm)
+        recommend_task = get_recommendations(request.transcript_text, "", transcript_rag)
         
         # 2. Wait for all tasks to complete
         # We use gather to run them in parallel
@@ -410,16 +483,18 @@ async def process_all(request: MindMapRequest):
         
         return {
             "summary": summary_res,
-            "mcqs": mcq_res.get("questions", []),
+            "mcqs": mcq_questions(mcq_res),
             "mind_map": mindmap_res,
             "recommendations": recommend_res
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Process All error: {e}")
-        print(traceback.format_exc())
+        LOG.exception("Process All error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
 
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
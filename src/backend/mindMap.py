@@ -1,10 +1,16 @@
 import re
+import logging
 from fastapi import HTTPException
-import traceback
+
+from llm_output import THINKING_RE
+
+LOG = logging.getLogger(__name__)
+
+_MERMAID_BLOCK_RE = re.compile(r'```(?:mermaid)?(.*?)```', re.DOTALL)
 
 class MindMapService:
     @staticmethod
-    def generate_mind_map(transcript_text, llm):
+    async def generate_mind_map(transcript_text, llm):
         try:
             prompt = f"""
             Based on the following transcript, create a comprehensive mind map in Mermaid.js format.
@@ -27,15 +33,14 @@ class MindMapService:
             {transcript_text[:4000]}
             """
             
-            response = llm.invoke(prompt)
+            response = await llm.ainvoke(prompt)
             content = response.content.strip()
             
             # Clean thinking/thought tags if present
-            content = re.sub(r'<thought>.*?</thought>', '', content, flags=re.DOTALL)
-            content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+            content = THINKING_RE.sub('', content)
             
             # Extract mermaid code block if LLM included it in markdown
-            mermaid_match = re.search(r'```(?:mermaid)?(.*?)```', content, re.DOTALL)
+            mermaid_match = _MERMAID_BLOCK_RE.search(content)
             if mermaid_match:
                 content = mermaid_match.group(1).strip()
             
@@ -59,6 +64,5 @@ class MindMapService:
             
             return content.strip()
         except Exception as e:
-            print(f"Mind map generation error: {e}")
-            print(traceback.format_exc())
+            LOG.exception("Mind map generation error: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
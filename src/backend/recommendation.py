@@ -1,59 +1,81 @@
+import os
 import re
 import asyncio
-from youtubesearchpython import VideosSearch
+import logging
+from cachetools import TTLCache
+from youtubesearchpython.__future__ import VideosSearch
 from fastapi import HTTPException
-import traceback
 
-async def get_recommendations(transcript_text, summary, transcript_rag, executor):
+from llm_output import THINKING_RE
+
+LOG = logging.getLogger(__name__)
+
+# Leading "1." / "-" / "*" list markers on generated search queries.
+_LIST_MARKER_RE = re.compile(r'^(\d+\.|\-|\*)\s*')
+
+# YouTube search results keyed by (normalized query, limit), shared by /search and
+# /recommend so both serve results of the same age.
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "300"))
+search_cache = TTLCache(maxsize=512, ttl=SEARCH_CACHE_TTL)
+
+# Number of LLM-generated queries searched, and how long one search may take before
+# it is dropped, so a stalled YouTube request can't hold up the whole response.
+MAX_REC_QUERIES = int(os.getenv("MAX_REC_QUERIES", "3"))
+RECOMMEND_SEARCH_TIMEOUT = float(os.getenv("RECOMMEND_SEARCH_TIMEOUT", "5"))
+
+async def cached_search(query, limit):
+    """(await VideosSearch(query, limit).next())["result"], memoized per (query, limit)."""
+    key = (query.lower(), limit)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+    results = (await VideosSearch(query, limit=limit).next()).get("result", [])
+    search_cache[key] = results
+    return results
+
+async def get_recommendations(transcript_text, summary, transcript_rag):
     try:
-        # Use Ollama via transcript_rag to generate 3 search queries
-        prompt_text = f"Based on the following content, suggest 3 specific YouTube search queries for 'Recommended Literature' or advanced study. Return ONLY the queries, one per line.\n\nContent: {summary or transcript_text[:2000]}"
+        # Use Ollama via transcript_rag to generate the search queries
+        prompt_text = f"Based on the following content, suggest {MAX_REC_QUERIES} specific YouTube search queries for 'Recommended Literature' or advanced study. Return ONLY the queries, one per line.\n\nContent: {summary or transcript_text[:2000]}"
         
         if transcript_rag is None:
             raise HTTPException(status_code=503, detail="RAG service not initialized")
 
         # Invoke Ollama
-        response = transcript_rag.llm.invoke(prompt_text)
+        response = await transcript_rag.llm.ainvoke(prompt_text)
         content = response.content.strip()
         
         # Clean thinking/thought tags if present
-        content = re.sub(r'<thought>.*?</thought>', '', content, flags=re.DOTALL)
-        content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+        content = THINKING_RE.sub('', content)
         
         queries = content.strip().split('\n')
         # Clean queries (remove numbers/bullets)
-        queries = [re.sub(r'^(\d+\.|\-|\*)\s*', '', q).strip() for q in queries if q.strip() and len(q.strip()) > 5]
+        queries = [_LIST_MARKER_RE.sub('', q).strip() for q in queries if q.strip() and len(q.strip()) > 5]
         
         all_recommendations = []
         
         async def fetch_recommendations(query):
-            def do_search():
-                try:
-                    search = VideosSearch(query, limit=2)
-                    return search.result().get("result", [])
-                except Exception as e:
-                    print(f"Search error for query '{query}': {e}")
-                    return []
-            
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(executor, do_search)
+            try:
+                return await asyncio.wait_for(cached_search(query, 2), RECOMMEND_SEARCH_TIMEOUT)
+            except asyncio.TimeoutError:
+                LOG.warning("Search timed out for query '%s'", query)
+                return []
+            except Exception as e:
+                LOG.warning("Search error for query '%s': %s", query, e)
+                return []
 
         # Fetch in parallel
-        tasks = [fetch_recommendations(q) for q in queries[:3]]
-        results = await asyncio.gather(*tasks)
+        results = await asyncio.gather(*(fetch_recommendations(q) for q in queries[:MAX_REC_QUERIES]))
         
         for res in results:
             all_recommendations.extend(res)
             
-        seen = set()
-        unique_recs = []
+        # Dedupe by link, keeping the first-seen result (the same link is the same video)
+        unique_recs = {}
         for r in all_recommendations:
-            if r['link'] not in seen:
-                unique_recs.append(r)
-                seen.add(r['link'])
-        
-        return unique_recs[:5]
+            if 'link' in r:
+                unique_recs.setdefault(r['link'], r)
+        return list(unique_recs.values())[:5]
     except Exception as e:
-        print(f"Recommendation error: {e}")
-        print(traceback.format_exc())
+        LOG.exception("Recommendation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
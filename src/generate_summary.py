@@ -1,4 +1,6 @@
 import os
+import hashlib
+from cachetools import LRUCache
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -7,15 +9,30 @@ load_dotenv()
 from langchain_community.chat_models.ollama import ChatOllama
 
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+SUMMARY_MODEL = "kimi-k2-thinking:cloud"
+
+# Bump when the prompt below changes so stale summaries are not served from the cache.
+SUMMARY_PROMPT_VERSION = "1"
+
+# Summaries keyed by model, prompt version and the exact transcript text sent to the LLM.
+summary_cache = LRUCache(maxsize=256)
 
 class Summarize:
 
-    def summarize_topic(transcript_text: str) -> str:
-        """Summarize a YouTube transcript using the KimiK2 thinking model (Ollama)."""
+    def _excerpt(transcript_text: str) -> str:
+        # Only the first 4000 characters are sent to the LLM (and keyed in the cache).
+        return transcript_text[:4000]
+
+    def _cache_key(excerpt: str) -> str:
+        return hashlib.sha256(
+            f"{SUMMARY_MODEL}:{SUMMARY_PROMPT_VERSION}:{excerpt}".encode("utf-8")
+        ).hexdigest()
+
+    def _build_llm_and_prompt(excerpt: str):
         headers = {}
 
         llm = ChatOllama(
-            model="kimi-k2-thinking:cloud",
+            model=SUMMARY_MODEL,
             base_url=OLLAMA_BASE_URL,
             headers=headers,
         )
@@ -26,8 +43,37 @@ Given the following transcript from a YouTube video, identify the main topic or
 Therefore, without wasting people's money, summarize the transcript of the youtube video in at most 400 words.
 
 Transcript:
-{transcript_text[:4000]}  # limit text for efficiency
+{excerpt}  # limit text for efficiency
         """.strip()
+        return llm, prompt
+
+    async def summarize_topic(transcript_text: str) -> str:
+        """Summarize a YouTube transcript using the KimiK2 thinking model (Ollama)."""
+        excerpt = Summarize._excerpt(transcript_text)
+        cache_key = Summarize._cache_key(excerpt)
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        llm, prompt = Summarize._build_llm_and_prompt(excerpt)
+        response = await llm.ainvoke(prompt)
+        summary = response.content.strip()
+        summary_cache[cache_key] = summary
+        return summary
+
+    async def stream_summary(transcript_text: str):
+        """Same as summarize_topic, but yields the summary text as the LLM produces it."""
+        excerpt = Summarize._excerpt(transcript_text)
+        cache_key = Summarize._cache_key(excerpt)
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
 
-        response = llm.invoke(prompt)
-        return response.content.strip()
+        llm, prompt = Summarize._build_llm_and_prompt(excerpt)
+        parts = []
+        async for chunk in llm.astream(prompt):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        summary_cache[cache_key] = "".join(parts).strip()
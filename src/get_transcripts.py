@@ -1,44 +1,93 @@
 import re
+import logging
 from youtube_transcript_api import YouTubeTranscriptApi
 import os
+import uuid
+import aiofiles
+import aiofiles.os
+
+LOG = logging.getLogger(__name__)
+
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|/embed/|/shorts/|/live/)([a-zA-Z0-9_-]{11})")
+
+# Maps a video title to a transcript filename in one pass: spaces become underscores,
+# '?' and '|' are dropped, and path separators and other characters Windows rejects
+# in filenames become underscores.
+TITLE_TO_FILENAME = str.maketrans({
+    " ": "_", "?": None, "|": None,
+    "/": "_", "\\": "_", ":": "_", "*": "_", '"': "_", "<": "_", ">": "_",
+})
+
+def write_text_atomic_sync(path: str, text: str) -> None:
+    """Blocking write_text_atomic, for callers without an event loop (the Streamlit app)."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+async def write_text_atomic(path: str, text: str) -> None:
+    """Writes text to a temp file beside path, then renames it over path, so readers
+    never see a half-written file."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:
+            await f.write(text)
+        await aiofiles.os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
 class gettranscripts:
 
+    @staticmethod
     def extract_video_id(url: str) -> str:
         """Extract the video ID from a YouTube URL."""
-        match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", url)
+        match = _VIDEO_ID_RE.search(url)
         if not match:
             raise ValueError("Invalid YouTube URL.")
         return match.group(1)
 
+    @staticmethod
     def get_transcript(video_id: str):
         """Fetch transcript with timestamps from YouTube."""
         transcript = YouTubeTranscriptApi().list(video_id).find_transcript(["en-GB", "en-US", "en", "de", "nl"]).fetch(preserve_formatting=True)
         return transcript
 
+    @staticmethod
     def format_transcript(transcript):
         """Format transcript text with readable timestamps."""
-        formatted = []
-        for t in transcript:
-            print(t.text)
-            minutes = int(t.start // 60)
-            seconds = int(t.start % 60)
-            print(minutes, seconds)
-            time_str = f"{minutes:02d}:{seconds:02d}"
-            formatted.append(f"[{time_str}] {t.text}")
-        return "\n".join(formatted)
+        return "\n".join(
+            "[{:02d}:{:02d}] {}".format(*divmod(int(t.start), 60), t.text)
+            for t in transcript
+        )
 
-    def save_transcript(title: str, transcript_text: str, output_file="transcript.txt"):
-        """Save title and transcript"""
-        # Create the 'transcripts' folder if it doesn't exist
+    @staticmethod
+    def _transcript_file(title: str, transcript_text: str, output_file: str):
+        """Path and contents of a saved transcript, creating the 'transcripts' folder if needed."""
         os.makedirs("transcripts", exist_ok=True)
-
-        # Build the full file path
         output_path = os.path.join("transcripts", output_file)
+        return output_path, f"{title}\n\nTranscript with Timestamps\n\n{transcript_text}"
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(f"{title}\n\n")
-            f.write("Transcript with Timestamps\n\n")
-            f.write(transcript_text)
-        print(f"Transcript saved to {output_path}")
+    @staticmethod
+    def save_transcript(title: str, transcript_text: str, output_file="transcript.txt"):
+        """Save title and transcript"""
+        output_path, contents = gettranscripts._transcript_file(title, transcript_text, output_file)
+        write_text_atomic_sync(output_path, contents)
+        LOG.info("Transcript saved to %s", output_path)
 
+    @staticmethod
+    async def asave_transcript(title: str, transcript_text: str, output_file="transcript.txt"):
+        """Same as save_transcript, but without blocking the event loop"""
+        output_path, contents = gettranscripts._transcript_file(title, transcript_text, output_file)
+        await write_text_atomic(output_path, contents)
+        LOG.info("Transcript saved to %s", output_path)
@@ -0,0 +1,4 @@
+import re
+
+# <thought>/<think> blocks emitted by reasoning models, stripped in one pass.
+THINKING_RE = re.compile(r'<(thought|think)>.*?</\1>', re.DOTALL)
@@ -1,9 +1,60 @@
-import json
 import re
+import logging
+import orjson
+import hashlib
+from cachetools import LRUCache
+
+from llm_output import THINKING_RE
+
+# Bump when the grading prompt changes so stale results are not served from the cache.
+GRADING_PROMPT_VERSION = "1"
+
+# Grading results keyed by model, prompt version, transcript and the user's answers.
+# MCQ generation is deliberately not cached: "Start New Quiz" expects fresh questions.
+grading_cache = LRUCache(maxsize=256)
+
+LOG = logging.getLogger(__name__)
+
+# Trailing commas before a closing brace/bracket, which LLMs often leave in JSON.
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+def _extract_json_object(content: str) -> str:
+    """Returns the first balanced {...} object, dropping code fences or prose around the JSON.
+
+    Single pass over the text; braces inside string literals are ignored. If the object
+    never closes, falls back to the first-'{'-to-last-'}' span.
+    """
+    start = content.find("{")
+    if start == -1:
+        return content
+    depth = 0
+    in_str = False
+    escaped = False
+    for i in range(start, len(content)):
+        ch = content[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return content[start:i + 1]
+    end = content.rfind("}")
+    if end > start:
+        return content[start:end + 1]
+    return content
 
 class MCQService:
     @staticmethod
-    def generate_mcqs_from_text(transcript_text: str, llm):
+    async def generate_mcqs_from_text(transcript_text: str, llm):
         """Generates MCQs using the provided LLM instance."""
         system_prompt = "You are an expert teacher. Create 5 multiple choice questions (MCQs) based on the provided transcript."
         user_prompt = f"""Return ONLY a raw JSON object.
@@ -26,34 +77,39 @@ class MCQService:
         try:
             # Construct message for LangChain LLM
             prompt = f"{system_prompt}\n\n{user_prompt}"
-            response = llm.invoke(prompt)
+            response = await llm.ainvoke(prompt, format="json")
             content = response.content.strip()
             
             # Clean thinking tags if present
-            content = re.sub(r'<thought>.*?</thought>', '', content, flags=re.DOTALL)
-            content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+            content = THINKING_RE.sub('', content)
             content = content.strip()
             
-            # Clean and extract JSON
-            content = re.sub(r'^```json\s*', '', content, flags=re.MULTILINE)
-            content = re.sub(r'^```\s*', '', content, flags=re.MULTILINE)
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                content = json_match.group(0)
+            # Extract JSON in case the model wrapped it in fences or prose
+            content = _extract_json_object(content)
             
-            return json.loads(content)
+            return orjson.loads(content)
         except Exception as e:
-            print(f"Error generating MCQs: {e}")
+            LOG.warning("Error generating MCQs: %s", e)
             raise e
 
     @staticmethod
-    def grade_mcq_answers(transcript_text: str, questions: list, user_answers: dict, llm):
+    async def grade_mcq_answers(transcript_text: str, questions: list, user_answers: dict, llm):
         """Implements LLM-as-a-judge with a formal grading rubric"""
         
-        qa_text = ""
+        qa_parts = []
         for q in questions:
             ua = user_answers.get(str(q['id'])) or user_answers.get(q['id'])
-            qa_text += f"Q{q['id']}: {q['question']}\nOptions: {q['options']}\nUser Answer: {ua}\n\n"
+            qa_parts.append(f"Q{q['id']}: {q['question']}\nOptions: {q['options']}\nUser Answer: {ua}\n\n")
+        qa_text = "".join(qa_parts)
+
+        # Slice the transcript once; the same excerpt feeds the cache key and the prompt.
+        excerpt = transcript_text[:15000]
+        cache_key = hashlib.sha256(
+            f"{getattr(llm, 'model', '')}:{GRADING_PROMPT_VERSION}:{excerpt}:{qa_text}".encode("utf-8")
+        ).hexdigest()
+        cached = grading_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         rubric = """
         ### Grading Rubric:
@@ -78,7 +134,7 @@ class MCQService:
         }}
 
         Transcript:
-        {transcript_text[:15000]}
+        {excerpt}
 
         User's Q&A:
         {qa_text}
@@ -86,25 +142,22 @@ class MCQService:
 
         try:
             prompt = f"{system_prompt}\n\n{user_prompt}"
-            response = llm.invoke(prompt)
+            response = await llm.ainvoke(prompt, format="json")
             content = response.content.strip()
             
             # Clean thinking tags
-            content = re.sub(r'<thought>.*?</thought>', '', content, flags=re.DOTALL)
-            content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+            content = THINKING_RE.sub('', content)
             content = content.strip()
             
-            # Clean and extract JSON
-            content = re.sub(r'^```json\s*', '', content, flags=re.MULTILINE)
-            content = re.sub(r'^```\s*', '', content, flags=re.MULTILINE)
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                content = json_match.group(0)
+            # Extract JSON in case the model wrapped it in fences or prose
+            content = _extract_json_object(content)
             
             # Additional cleaning
-            content = re.sub(r',(\s*[}\]])', r'\1', content)
+            content = _TRAILING_COMMA_RE.sub(r'\1', content)
             
-            return json.loads(content)
+            result = orjson.loads(content)
+            grading_cache[cache_key] = result
+            return result
         except Exception as e:
-            print(f"Error grading answers: {e}")
+            LOG.warning("Error grading answers: %s", e)
             raise e
\ No newline at end of file
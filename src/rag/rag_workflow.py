@@ -1,14 +1,19 @@
 import os
 import time
 import re
-import json
+import orjson
 import hashlib
+import functools
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Literal, Optional
 
 import numpy as np
 import cohere
 import torch
+from cachetools import LRUCache
 
 from dotenv import load_dotenv
 from langchain_text_splitters.character import RecursiveCharacterTextSplitter
@@ -27,6 +32,12 @@ try:
 except Exception:
     GraphDatabase = None
 
+# gRPC transport for Pinecone data-plane calls when the pinecone[grpc] extra is installed.
+try:
+    from pinecone.grpc import PineconeGRPC
+except Exception:
+    PineconeGRPC = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 LOG = logging.getLogger(__name__)
@@ -34,6 +45,10 @@ LOG = logging.getLogger(__name__)
 load_dotenv()
 
 
+# Texts per forward pass of the local Nomic model.
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", "32"))
+
+
 class NomicLocalEmbeddings(Embeddings):
     """
     Embeddings using a local/quantized HuggingFace Nomic embedding model.
@@ -50,19 +65,32 @@ class NomicLocalEmbeddings(Embeddings):
 
     def _embed(self, texts: list[str], task: str) -> list[list[float]]:
         prefix = task + ": "
-        inputs = self.tokenizer(
-            [prefix + t for t in texts],
-            padding=True,
-            truncation=True,
-            return_tensors="pt",
-        ).to(self.model.device)
-
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            embeddings = outputs.last_hidden_state.mean(dim=1)
-            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
-
-        return embeddings.cpu().tolist()
+        # Batch texts of similar length together so little compute goes to padding;
+        # results are written back in the caller's order.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings: list[list[float]] = [None] * len(texts)
+
+        for start in range(0, len(order), LOCAL_EMBED_BATCH_SIZE):
+            batch_ids = order[start:start + LOCAL_EMBED_BATCH_SIZE]
+            inputs = self.tokenizer(
+                [prefix + texts[i] for i in batch_ids],
+                padding=True,
+                truncation=True,
+                return_tensors="pt",
+            ).to(self.model.device)
+
+            with torch.inference_mode():
+                outputs = self.model(**inputs)
+                hidden = outputs.last_hidden_state
+                # Mean over real tokens only, so a text's vector does not depend on its batch-mates
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+
+            for i, vector in zip(batch_ids, pooled.float().cpu().tolist()):
+                embeddings[i] = vector
+
+        return embeddings
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         return self._embed(texts, task="search_document")
@@ -71,6 +99,113 @@ class NomicLocalEmbeddings(Embeddings):
         return self._embed([text], task="search_query")[0]
 
 
+@functools.lru_cache(maxsize=4)
+def load_nomic_local_embeddings(model_path: str) -> NomicLocalEmbeddings:
+    """
+    Loads the quantized local Nomic model once per path; every TranscriptRAG
+    in the process shares the same weights instead of loading its own copy.
+    """
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_compute_dtype=torch.bfloat16 if torch.cuda.is_available() else torch.float16,
+        bnb_4bit_use_double_quant=True,
+        bnb_4bit_quant_type="nf4",
+    )
+    LOG.info("Loading quantized Nomic embeddings from: %s", model_path)
+
+    # Robust path discovery: if config.json isn't in root, check subdirectories
+    actual_model_path = model_path
+    if not os.path.exists(os.path.join(actual_model_path, "config.json")):
+        for root, dirs, files in os.walk(model_path):
+            if "config.json" in files:
+                actual_model_path = root
+                LOG.info("Found model config in subdirectory: %s", actual_model_path)
+                break
+
+    tokenizer = AutoTokenizer.from_pretrained(actual_model_path, trust_remote_code=True)
+    model = AutoModel.from_pretrained(
+        actual_model_path,
+        quantization_config=bnb_config,
+        torch_dtype=torch.bfloat16,
+        device_map="auto",
+        trust_remote_code=True,
+    )
+    return NomicLocalEmbeddings(model=model, tokenizer=tokenizer)
+
+
+# nomic-embed-text emits 768-dim vectors.
+FULL_EMBEDDING_DIM = 768
+
+# Texts per embedding request; OllamaEmbeddings sends each batch as a single /api/embed call.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "96"))
+
+RERANK_MODEL = "rerank-english-v3.0"
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "4096"))
+# Cosine score of the best Pinecone match at or above which Cohere reranking is skipped.
+RERANK_SKIP_SCORE = float(os.getenv("RERANK_SKIP_SCORE", "0.85"))
+
+# Vectors per Pinecone upsert request (LangChain's default is 32; Pinecone accepts up to 1000 / 2 MB).
+PINECONE_UPSERT_BATCH_SIZE = 100
+
+# Embedding requests in flight at once during semantic chunking (match the server's OLLAMA_NUM_PARALLEL).
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))
+
+# Sentence boundaries used by _clean_transcript; [MM:SS] markers stay attached to their sentence.
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# [MM:SS] markers written by gettranscripts.format_transcript (minutes may exceed two digits).
+_TIMESTAMP_RE = re.compile(r"\[\d+:\d{2}\]")
+
+# Characters Pinecone does not allow in index names; each one maps to a single '-' so
+# names of existing indexes are unchanged.
+_INDEX_NAME_INVALID_RE = re.compile(r"[^a-z0-9]")
+
+# First-to-last brace span, for LLM replies that wrap their JSON in prose or fences.
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Recent query embeddings; chat follow-ups and retries often repeat the same question.
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# Answers are reused for a new question on the same transcript whose embedding has at
+# least this cosine similarity to an earlier one (a repeat or light paraphrase); 0 disables.
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_PER_TRANSCRIPT = int(os.getenv("ANSWER_CACHE_PER_TRANSCRIPT", "64"))
+
+
+def _mean_pool(vectors: np.ndarray) -> list[float]:
+    """Averages a block of sentence embeddings into one unit-length chunk embedding."""
+    pooled = vectors.mean(axis=0)
+    pooled /= np.linalg.norm(pooled) + 1e-12
+    return pooled.tolist()
+
+
+class TruncatedEmbeddings(Embeddings):
+    """
+    Matryoshka-style truncation of another embedding model.
+
+    nomic-embed-text v1.5 is trained so that its leading dimensions carry most of
+    the signal; keeping the first `dimensions` components and re-normalizing
+    shrinks the Pinecone index and query payloads with little recall loss.
+    """
+
+    def __init__(self, base: Embeddings, dimensions: int):
+        self.base = base
+        self.dimensions = dimensions
+
+    def _truncate(self, vectors: list[list[float]]) -> list[list[float]]:
+        if not vectors:
+            return []
+        arr = np.asarray(vectors, dtype=np.float32)[:, : self.dimensions]
+        arr /= np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
+        return arr.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._truncate(self.base.embed_documents(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._truncate([self.base.embed_query(text)])[0]
+
+
 class TranscriptRAG:
     def __init__(self):
         # Configuration
@@ -83,7 +218,7 @@ class TranscriptRAG:
         # Default to host.docker.internal if not provided, which works with the new docker-compose
         self.ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
         
-        LOG.info(f"Connecting to Ollama at: {self.ollama_base_url}")
+        LOG.info("Connecting to Ollama at: %s", self.ollama_base_url)
         
         # Validate required environment variables
         if not self.ollama_base_url:
@@ -101,34 +236,9 @@ class TranscriptRAG:
         self.embed_model: Embeddings
         if self.nomic_model_path:
             try:
-                bnb_config = BitsAndBytesConfig(
-                    load_in_4bit=True,
-                    bnb_4bit_compute_dtype=torch.bfloat16 if torch.cuda.is_available() else torch.float16,
-                    bnb_4bit_use_double_quant=True,
-                    bnb_4bit_quant_type="nf4",
-                )
-                LOG.info(f"Loading quantized Nomic embeddings from: {self.nomic_model_path}")
-                
-                # Robust path discovery: if config.json isn't in root, check subdirectories
-                actual_model_path = self.nomic_model_path
-                if not os.path.exists(os.path.join(actual_model_path, "config.json")):
-                    for root, dirs, files in os.walk(self.nomic_model_path):
-                        if "config.json" in files:
-                            actual_model_path = root
-                            LOG.info(f"Found model config in subdirectory: {actual_model_path}")
-                            break
-
-                tokenizer = AutoTokenizer.from_pretrained(actual_model_path, trust_remote_code=True)
-                model = AutoModel.from_pretrained(
-                    actual_model_path,
-                    quantization_config=bnb_config,
-                    torch_dtype=torch.bfloat16,
-                    device_map="auto",
-                    trust_remote_code=True,
-                )
-                self.embed_model = NomicLocalEmbeddings(model=model, tokenizer=tokenizer)
+                self.embed_model = load_nomic_local_embeddings(self.nomic_model_path)
             except Exception as e:
-                LOG.warning(f"Failed to load local quantized embeddings; falling back to Ollama. Error: {e}")
+                LOG.warning("Failed to load local quantized embeddings; falling back to Ollama. Error: %s", e)
                 self.embed_model = OllamaEmbeddings(
                     model="nomic-embed-text",
                     base_url=self.ollama_base_url,
@@ -139,12 +249,43 @@ class TranscriptRAG:
                 base_url=self.ollama_base_url,
             )
 
+        # Parallel embedding requests only help a remote Ollama server; the local model runs one batch at a time.
+        self.embed_concurrency = 1 if isinstance(self.embed_model, NomicLocalEmbeddings) else OLLAMA_EMBED_CONCURRENCY
+
+        # Optional Matryoshka truncation (e.g. EMBEDDING_DIMENSIONS=512); defaults to the full size.
+        self.embedding_dim = int(os.getenv("EMBEDDING_DIMENSIONS", str(FULL_EMBEDDING_DIM)))
+        if self.embedding_dim < FULL_EMBEDDING_DIM:
+            LOG.info("Truncating embeddings to %s dimensions", self.embedding_dim)
+            self.embed_model = TruncatedEmbeddings(self.embed_model, self.embedding_dim)
+
         # Initialize Clients
         self.pinecone_enabled = bool(self.pinecone_api_key)
         self.pinecone_client: Optional[Pinecone] = None
         if self.pinecone_enabled:
-            self.pinecone_client = Pinecone(api_key=self.pinecone_api_key)
+            pinecone_cls = PineconeGRPC or Pinecone
+            self.pinecone_client = pinecone_cls(api_key=self.pinecone_api_key)
         # Note: PineconeVectorStore instances are created on-demand with specific index names
+        # Index names already confirmed to exist, so repeat calls skip list_indexes().
+        self._known_indexes: set[str] = set()
+        # query_transcript runs on executor threads, so the cache is guarded by a lock.
+        self._query_embedding_cache = LRUCache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+        self._query_embedding_lock = threading.Lock()
+        self._query_chain = None
+        # One PineconeVectorStore per recently used index.
+        self._vectorstores = LRUCache(maxsize=64)
+        self._vectorstore_lock = threading.Lock()
+        # Cohere relevance scores keyed by (query hash, document hash).
+        self._rerank_cache = LRUCache(maxsize=RERANK_CACHE_SIZE)
+        self._rerank_lock = threading.Lock()
+        # Recent (unit query vector, answer) pairs per transcript, for the semantic answer cache.
+        self._answer_cache = LRUCache(maxsize=256)
+        self._answer_lock = threading.Lock()
+        # Agentic chunking decisions keyed by transcript sample; the player re-ingests on every visit.
+        self._strategy_cache = LRUCache(maxsize=256)
+        self._strategy_lock = threading.Lock()
+        # Hashes of (index, strategy, transcript) already ingested by this process, for recent transcripts.
+        self._ingested_transcripts = LRUCache(maxsize=1024)
+        self._ingested_lock = threading.Lock()
 
         # GraphRAG: optional Neo4j connection
         self.neo4j_uri = os.getenv("NEO4J_URI")
@@ -161,9 +302,9 @@ class TranscriptRAG:
                     auth=(self.neo4j_username, self.neo4j_password),
                 )
                 self.graph_enabled = True
-                LOG.info(f"GraphRAG enabled (Neo4j): {self.neo4j_uri}")
+                LOG.info("GraphRAG enabled (Neo4j): %s", self.neo4j_uri)
             except Exception as e:
-                LOG.warning(f"GraphRAG disabled; Neo4j connection failed: {e}")
+                LOG.warning("GraphRAG disabled; Neo4j connection failed: %s", e)
                 self.neo4j_driver = None
                 self.graph_enabled = False
         
@@ -178,27 +319,72 @@ class TranscriptRAG:
             base_url=self.ollama_base_url, 
         )
 
+    def warm_up(self) -> None:
+        """Loads the embedding model and LLM so the first /ingest or /chat doesn't pay for it."""
+        try:
+            import ollama
+
+            self.embed_model.embed_query("warmup")
+            # An empty prompt makes Ollama load the model without generating anything
+            ollama.Client(host=self.ollama_base_url).generate(model=self.llm.model, prompt="")
+            LOG.info("Embedding model and LLM warmed up")
+        except Exception as e:
+            LOG.warning("Model warm-up failed (continuing): %s", e)
+
     def _sanitize_index_name(self, name: str) -> str:
-        return "".join(c if c.isalnum() else "-" for c in name).lower().strip("-")
+        return _INDEX_NAME_INVALID_RE.sub("-", name.lower()).strip("-")
+
+    def _transcript_index_name(self, transcript_id: str) -> str:
+        name = f"transcript-{transcript_id}"
+        if self.embedding_dim != FULL_EMBEDDING_DIM:
+            # Truncated vectors cannot share an index with full-size ones, so existing
+            # indexes are left alone and transcripts are re-embedded into a new one.
+            name += f"-d{self.embedding_dim}"
+        return self._sanitize_index_name(name)
 
     def _clean_transcript(self, text: str) -> list[str]:
         """
         Splits into clean sentences while PRESERVING timestamps.
         """
-        # Split into sentences but keep the [MM:SS] markers
-        sentences = [
-            s.strip()
-            for s in re.split(r"(?<=[.!?])\s+", text)
-            if len(s.strip()) > 5
-        ]
-        return sentences
+        # Split into sentences but keep the [MM:SS] markers; each piece is stripped once
+        stripped = (s.strip() for s in _SENTENCE_SPLIT_RE.split(text))
+        return [s for s in stripped if len(s) > 5]
+
+    def _dedupe_chunks(
+        self, chunks: list[Document], embeddings: Optional[list[list[float]]] = None
+    ) -> tuple[list[Document], Optional[list[list[float]]]]:
+        """
+        Drops chunks that repeat an earlier one once timestamps, case and whitespace
+        are ignored (recurring intros, sponsor reads), along with their embeddings.
+        """
+        seen = set()
+        keep = []
+        for i, chunk in enumerate(chunks):
+            key = " ".join(_TIMESTAMP_RE.sub("", chunk.page_content).lower().split())
+            if key not in seen:
+                seen.add(key)
+                keep.append(i)
+
+        if len(keep) == len(chunks):
+            return chunks, embeddings
+        LOG.info("Dropped %s duplicate chunks", len(chunks) - len(keep))
+        chunks = [chunks[i] for i in keep]
+        if embeddings is not None:
+            embeddings = [embeddings[i] for i in keep]
+        return chunks, embeddings
 
     def _decide_chunking_strategy(self, transcript_text: str) -> Literal["recursive", "semantic"]:
         """
         Uses the LLM to decide which chunking strategy to use.
         """
-        LOG.info("Deciding chunking strategy...")
         sample = transcript_text[:2000]  # Analyze first 2000 chars
+        cache_key = hashlib.sha256(sample.encode("utf-8")).hexdigest()
+        with self._strategy_lock:
+            cached = self._strategy_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        LOG.info("Deciding chunking strategy...")
         
         prompt = ChatPromptTemplate.from_template("""
             Analyze the following transcript snippet and decide if it should be chunked using a 'recursive' or 'semantic' strategy.
@@ -214,54 +400,60 @@ class TranscriptRAG:
         chain = prompt | self.llm
         try:
             decision = chain.invoke({"sample": sample}).content.strip().lower()
-            if "semantic" in decision:
-                return "semantic"
-            return "recursive"
+            strategy = "semantic" if "semantic" in decision else "recursive"
+            with self._strategy_lock:
+                self._strategy_cache[cache_key] = strategy
+            return strategy
         except Exception as e:
-            LOG.warning(f"Failed to decide strategy agentically: {e}. Falling back to recursive.")
+            LOG.warning("Failed to decide strategy agentically: %s. Falling back to recursive.", e)
             return "recursive"
 
-    def _semantic_chunking(self, sentences: list[str], threshold: float = 0.7) -> list[str]:
+    def _semantic_chunking(self, sentences: list[str], threshold: float = 0.7) -> tuple[list[str], list[list[float]]]:
         """
         Groups sentences based on semantic similarity.
         Mimics 'semantic_chunking_node' from workflow using existing Ollama embeddings.
+
+        Returns the chunks together with their embeddings, mean-pooled from the
+        sentence embeddings already computed here, so ingestion does not have to
+        run the embedding model over the same text a second time.
         """
         LOG.info("Performing Semantic Chunking...")
-        # Get embeddings for all sentences (batched to avoid context limits)
-        embeddings = []
-        batch_size = 20  # Process 20 sentences at a time
-        for i in range(0, len(sentences), batch_size):
-            batch = sentences[i:i + batch_size]
+        # Get embeddings for all sentences (batched to avoid context limits),
+        # written straight into one float32 matrix sized on the first batch.
+        # Batches are sent concurrently so a multi-slot Ollama server is kept busy.
+        batch_size = EMBED_BATCH_SIZE
+        batches = [sentences[i:i + batch_size] for i in range(0, len(sentences), batch_size)]
+
+        def embed_batch(index: int) -> list[list[float]]:
             try:
-                batch_embeddings = self.embed_model.embed_documents(batch)
-                embeddings.extend(batch_embeddings)
+                return self.embed_model.embed_documents(batches[index])
             except Exception as e:
-                LOG.error(f"Error embedding batch {i//batch_size}: {e}")
-                # Fallback: try one by one or skip? For now, re-raise to fail fast
-                raise e
+                LOG.error("Error embedding batch %s: %s", index, e)
+                raise
+
+        vectors = None
+        workers = max(1, min(self.embed_concurrency, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for b, batch_embeddings in enumerate(pool.map(embed_batch, range(len(batches)))):
+                if vectors is None:
+                    vectors = np.empty((len(sentences), len(batch_embeddings[0])), dtype=np.float32)
+                vectors[b * batch_size:b * batch_size + len(batch_embeddings)] = batch_embeddings
         
         chunks = []
+        chunk_embeddings = []
         if not sentences:
-            return chunks
-            
-        current_chunk = [sentences[0]]
-        current_emb = embeddings[0]
+            return chunks, chunk_embeddings
 
-        for i in range(1, len(sentences)):
-            sim = np.dot(embeddings[i], embeddings[i-1]) / (
-                np.linalg.norm(embeddings[i]) * np.linalg.norm(embeddings[i-1])
-            )
-            
-            if sim < threshold:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = []
-            
-            current_chunk.append(sentences[i])
+        # Normalize once, then take every adjacent cosine similarity in one vectorized pass
+        unit = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+        sims = np.einsum("ij,ij->i", unit[1:], unit[:-1])
+        breaks = (np.flatnonzero(sims < threshold) + 1).tolist()
 
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+        for start, end in zip([0] + breaks, breaks + [len(sentences)]):
+            chunks.append(" ".join(sentences[start:end]))
+            chunk_embeddings.append(_mean_pool(vectors[start:end]))
             
-        return chunks
+        return chunks, chunk_embeddings
 
     # ----------------------------
     # GraphRAG (Neo4j) helpers
@@ -293,7 +485,7 @@ class TranscriptRAG:
                         continue
             self._graph_schema_initialized = True
         except Exception as e:
-            LOG.warning(f"Graph schema initialization failed (continuing): {e}")
+            LOG.warning("Graph schema initialization failed (continuing): %s", e)
 
     def _graph_extract_entities(self, text: str, max_entities: int = 10) -> list[dict]:
         """
@@ -319,10 +511,10 @@ TEXT:
         try:
             msg = chain.invoke({"max_entities": max_entities, "text": text}).content
             # Robust JSON extraction in case the model wraps the JSON.
-            m = re.search(r"\{.*\}", msg, flags=re.DOTALL)
+            m = _JSON_OBJECT_RE.search(msg)
             if not m:
                 return []
-            payload = json.loads(m.group(0))
+            payload = orjson.loads(m.group(0))
             entities = payload.get("entities", [])
             if not isinstance(entities, list):
                 return []
@@ -340,7 +532,7 @@ TEXT:
                 cleaned.append({"name": name, "type": typ})
             return cleaned
         except Exception as e:
-            LOG.warning(f"Entity extraction failed (continuing): {e}")
+            LOG.warning("Entity extraction failed (continuing): %s", e)
             return []
 
     def _graph_upsert_chunks(self, transcript_id: str, chunks: list[Document]) -> None:
@@ -433,7 +625,7 @@ TEXT:
             return []
 
         # Rerank candidate chunks using embedding similarity (cosine).
-        query_emb = np.array(self.embed_model.embed_query(query), dtype=np.float32)
+        query_emb = np.array(self._embed_query(query), dtype=np.float32)
         doc_embs = self.embed_model.embed_documents(candidate_texts)
         doc_embs_np = np.array(doc_embs, dtype=np.float32)
 
@@ -447,44 +639,160 @@ TEXT:
 
         return [Document(page_content=t, metadata={"source": transcript_id}) for t in top_texts]
 
+    def _index_exists(self, index_name: str) -> bool:
+        """Checks Pinecone for the index, remembering names that are known to exist."""
+        if index_name in self._known_indexes:
+            return True
+        existing_indexes = {i.name for i in self.pinecone_client.list_indexes()}
+        self._known_indexes.update(existing_indexes)
+        return index_name in existing_indexes
+
+    def _embed_query(self, query: str) -> list[float]:
+        """Embeds a query, reusing the vector for queries seen recently."""
+        with self._query_embedding_lock:
+            cached = self._query_embedding_cache.get(query)
+        if cached is not None:
+            return cached
+        embedding = self.embed_model.embed_query(query)
+        with self._query_embedding_lock:
+            self._query_embedding_cache[query] = embedding
+        return embedding
+
+    @staticmethod
+    def _unit_vector(embedding) -> Optional[np.ndarray]:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else None
+
+    def _cached_answer(self, transcript_id: str, query_vec: np.ndarray) -> Optional[str]:
+        """Answer to an earlier question on this transcript that is nearly the same as the query."""
+        with self._answer_lock:
+            entries = list(self._answer_cache.get(transcript_id, ()))
+        if not entries:
+            return None
+        sims = np.stack([vec for vec, _ in entries]) @ query_vec
+        best = int(np.argmax(sims))
+        if sims[best] >= ANSWER_CACHE_SIMILARITY:
+            return entries[best][1]
+        return None
+
+    def _remember_answer(self, transcript_id: str, query_vec: np.ndarray, answer: str) -> None:
+        with self._answer_lock:
+            entries = self._answer_cache.get(transcript_id)
+            if entries is None:
+                entries = deque(maxlen=ANSWER_CACHE_PER_TRANSCRIPT)
+                self._answer_cache[transcript_id] = entries
+            entries.append((query_vec, answer))
+
+    def _rerank_scores(self, query: str, doc_texts: list[str]) -> list[float]:
+        """
+        Cohere relevance score for each document, reusing scores cached for the
+        same (query, document) pair so only unseen documents are sent to Cohere.
+        """
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        keys = [(query_hash, hashlib.sha1(t.encode("utf-8")).hexdigest()) for t in doc_texts]
+        with self._rerank_lock:
+            scores = [self._rerank_cache.get(k) for k in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            results = self.cohere_client.rerank(
+                model=RERANK_MODEL,
+                query=query,
+                documents=[doc_texts[i] for i in missing],
+                top_n=len(missing),
+            )
+            with self._rerank_lock:
+                for r in results.results:
+                    i = missing[r.index]
+                    scores[i] = r.relevance_score
+                    self._rerank_cache[keys[i]] = r.relevance_score
+        # Anything Cohere did not score sorts last
+        return [score if score is not None else float("-inf") for score in scores]
+
+    def _get_vectorstore(self, index_name: str) -> PineconeVectorStore:
+        """PineconeVectorStore for an index, created once and reused across requests."""
+        with self._vectorstore_lock:
+            vectorstore = self._vectorstores.get(index_name)
+        if vectorstore is None:
+            vectorstore = PineconeVectorStore(
+                embedding=self.embed_model,
+                index_name=index_name,
+                pinecone_api_key=self.pinecone_api_key,
+            )
+            with self._vectorstore_lock:
+                self._vectorstores[index_name] = vectorstore
+        return vectorstore
+
+    def _get_query_chain(self):
+        """Builds the answer prompt | LLM chain on first use and reuses it for every query."""
+        if self._query_chain is None:
+            prompt = ChatPromptTemplate.from_template("""
+            Answer the question based ONLY on the context below.
+            The context contains timestamps in [MM:SS] format. 
+            If the user asks about a specific time or "when" something happened, use these timestamps to provide an accurate answer.
+            
+            <context>
+            {context}
+            </context>
+            
+            Question: {input}
+            
+            Answer (be concise and reference timestamps if relevant):
+        """)
+            self._query_chain = prompt | self.llm
+        return self._query_chain
+
     def create_transcript_index(self, transcript_id: str):
         """Creates a dedicated Pinecone index."""
-        index_name = self._sanitize_index_name(f"transcript-{transcript_id}")
+        index_name = self._transcript_index_name(transcript_id)
         if not self.pinecone_enabled or not self.pinecone_client:
             LOG.warning("Pinecone not configured; skipping index creation.")
             return index_name
-        existing_indexes = [i.name for i in self.pinecone_client.list_indexes()]
         
-        if index_name not in existing_indexes:            
-            LOG.info(f"Creating new index: {index_name}")
+        if not self._index_exists(index_name):            
+            LOG.info("Creating new index: %s", index_name)
             try:
                 self.pinecone_client.create_index(
                     name=index_name,
-                    dimension=768, # nomic-embed-text dimension (change if using different embedding model)
+                    dimension=self.embedding_dim,
                     metric="cosine",
                     spec=ServerlessSpec(cloud="aws", region="us-east-1") 
                 )
-                # Wait for index to be ready (simple approach - wait and verify)
-                max_wait = 60  # Maximum 60 seconds
-                waited = 0
-                while waited < max_wait:
-                    try:
-                        # Try to get the index - if it works, it's ready
-                        index = self.pinecone_client.Index(index_name)
-                        # Try a simple operation to verify it's ready
-                        index.describe_index_stats()
-                        LOG.info(f"Index {index_name} is ready")
+                # Poll the control plane until the index reports ready, backing off from 0.2s
+                deadline = time.monotonic() + 60  # Maximum 60 seconds
+                delay = 0.2
+                while not self.pinecone_client.describe_index(index_name).status.ready:
+                    if time.monotonic() >= deadline:
+                        LOG.warning("Index %s may not be ready yet, but proceeding...", index_name)
                         break
-                    except Exception:
-                        time.sleep(2)
-                        waited += 2
-                if waited >= max_wait:
-                    LOG.warning(f"Index {index_name} may not be ready yet, but proceeding...")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 5)
+                else:
+                    LOG.info("Index %s is ready", index_name)
+                self._known_indexes.add(index_name)
             except Exception as e:
-                LOG.error(f"Failed to create index: {e}")
+                LOG.error("Failed to create index: %s", e)
                 raise
         return index_name
 
+    def _chunk_id(self, index_name: str, chunk: Document) -> str:
+        """Content-derived vector ID, so re-ingesting a chunk overwrites it instead of duplicating it."""
+        return hashlib.sha256(f"{index_name}:{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+
+    def _upsert_embedded_chunks(self, index_name: str, chunks: list[Document], embeddings: list[list[float]]):
+        """
+        Upserts chunks whose embeddings are already known, in the same layout
+        PineconeVectorStore uses (chunk text under the "text" metadata key).
+        """
+        index = self.pinecone_client.Index(index_name)
+        vectors = [
+            (self._chunk_id(index_name, chunk), embedding, {**chunk.metadata, "text": chunk.page_content})
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+        for i in range(0, len(vectors), PINECONE_UPSERT_BATCH_SIZE):
+            index.upsert(vectors=vectors[i:i + PINECONE_UPSERT_BATCH_SIZE])
+
     def ingest_transcript(self, 
                          transcript_text: str, 
                          transcript_id: str, 
@@ -493,7 +801,15 @@ TEXT:
         Ingests transcript with selectable strategy (Default: Recursive).
         """
         
-        index_name = self._sanitize_index_name(f"transcript-{transcript_id}")
+        index_name = self._transcript_index_name(transcript_id)
+
+        # The player re-ingests on every visit; skip transcripts this process already indexed.
+        ingest_key = hashlib.sha256(f"{index_name}:{strategy}:{transcript_text}".encode("utf-8")).hexdigest()
+        with self._ingested_lock:
+            already_ingested = self._ingested_transcripts.get(ingest_key, False)
+        if already_ingested:
+            LOG.info("Transcript %s already ingested; skipping.", transcript_id)
+            return
 
         # 1. Clean Text (Preserving timestamps)
         sentences = self._clean_transcript(transcript_text)
@@ -502,42 +818,68 @@ TEXT:
         # 2. Decide Strategy if Agentic
         if strategy == "agentic":
             strategy = self._decide_chunking_strategy(transcript_text)
-            LOG.info(f"Agentic decision: Using '{strategy}' strategy.")
+            LOG.info("Agentic decision: Using '%s' strategy.", strategy)
 
         chunks = []
+        chunk_embeddings = None
         if strategy == "semantic":
             # Use the new semantic chunker
-            chunk_texts = self._semantic_chunking(sentences)
+            chunk_texts, chunk_embeddings = self._semantic_chunking(sentences)
             chunks = [Document(page_content=t, metadata={"source": transcript_id}) for t in chunk_texts]
         else:
             # Fallback to standard recursive
             text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
             chunks = text_splitter.create_documents([cleaned_text], metadatas=[{"source": transcript_id}])
 
-        LOG.info(f"Generated {len(chunks)} chunks using '{strategy}' strategy. Printing them below: ")
+        chunks, chunk_embeddings = self._dedupe_chunks(chunks, chunk_embeddings)
 
-        for chunk in chunks:
-            LOG.info(chunk)
+        avg_chars = sum(len(c.page_content) for c in chunks) // max(1, len(chunks))
+        LOG.info("Generated %s chunks (avg %s chars) using '%s' strategy.", len(chunks), avg_chars, strategy)
+        if LOG.isEnabledFor(logging.DEBUG):
+            for chunk in chunks:
+                LOG.debug(chunk)
 
         # 2. Upsert documents to Pinecone (optional)
-        if self.pinecone_enabled:
-            # Create vectorstore with the specific index and add documents
-            vectorstore = PineconeVectorStore(
-                embedding=self.embed_model,
-                index_name=index_name,
-                pinecone_api_key=self.pinecone_api_key,
+        if self.pinecone_enabled and chunk_embeddings is not None:
+            self._upsert_embedded_chunks(index_name, chunks, chunk_embeddings)
+        elif self.pinecone_enabled:
+            # Add documents through the vectorstore for this index
+            vectorstore = self._get_vectorstore(index_name)
+            vectorstore.add_documents(
+                documents=chunks,
+                ids=[self._chunk_id(index_name, chunk) for chunk in chunks],
+                batch_size=PINECONE_UPSERT_BATCH_SIZE,
             )
-            vectorstore.add_documents(documents=chunks)
 
         # 3. Graph ingestion for GraphRAG (optional)
         if self.graph_enabled:
             self._graph_upsert_chunks(transcript_id=transcript_id, chunks=chunks)
 
+        with self._ingested_lock:
+            self._ingested_transcripts[ingest_key] = True
+        # Answers given against the previous contents of this transcript no longer apply.
+        with self._answer_lock:
+            self._answer_cache.pop(transcript_id, None)
+
     def query_transcript(self, transcript_id: str, query: str, use_reranker: bool = True, stream: bool = False) -> str:
         """
         Performs RAG with optional Cohere Reranking.
         """
         
+        # 0) Repeated or paraphrased questions reuse the earlier answer
+        query_vec = None
+        if ANSWER_CACHE_SIMILARITY > 0:
+            try:
+                query_vec = self._unit_vector(self._embed_query(query))
+            except Exception as e:
+                # GraphRAG retrieval can still answer without a query embedding
+                LOG.warning("Query embedding failed; skipping the answer cache: %s", e)
+        if query_vec is not None:
+            cached = self._cached_answer(transcript_id, query_vec)
+            if cached is not None:
+                LOG.info("Answering from the semantic answer cache.")
+                return iter([cached]) if stream else cached
+
         docs = []
 
         # 1) GraphRAG retrieval (Neo4j) if enabled
@@ -547,24 +889,26 @@ TEXT:
 
         # 2) Fallback to Pinecone retrieval if GraphRAG returns nothing
         if (not docs) and self.pinecone_enabled and self.pinecone_client:
-            index_name = self._sanitize_index_name(f"transcript-{transcript_id}")
+            index_name = self._transcript_index_name(transcript_id)
 
             # Check if it exists; if not, create it
-            if index_name not in [idx.name for idx in self.pinecone_client.list_indexes()]:
+            if not self._index_exists(index_name):
                 self.pinecone_client.create_index(
                     name=index_name,
-                    dimension=768,
+                    dimension=self.embedding_dim,
                     metric="cosine",
                     spec=ServerlessSpec(cloud="aws", region="us-east-1"),
                 )
+                self._known_indexes.add(index_name)
 
-            vectorstore = PineconeVectorStore.from_existing_index(
-                index_name=index_name,
-                embedding=self.embed_model,
-            )
+            vectorstore = self._get_vectorstore(index_name)
 
-            retriever = vectorstore.as_retriever(search_kwargs={"k": top_k})
-            docs = retriever.invoke(query)
+            scored = vectorstore.similarity_search_by_vector_with_score(self._embed_query(query), k=top_k)
+            docs = [doc for doc, _ in scored]
+            # A very close top match means the retriever order is already trustworthy
+            if scored and scored[0][1] >= RERANK_SKIP_SCORE:
+                LOG.info("Top retrieval score %.3f; skipping rerank.", scored[0][1])
+                use_reranker = False
         
         if not docs:
             LOG.warning("No documents retrieved from Pinecone.")
@@ -577,56 +921,44 @@ TEXT:
         
         # 2. Apply Cohere Reranking
         final_context = ""
-        if use_reranker and self.cohere_client:
+        # Reranking can only reorder the candidates, so skip the round-trip when all of them fit in the context
+        if use_reranker and self.cohere_client and len(docs) > 5:
             LOG.info("Reranking retrieved documents...")
             doc_texts = [d.page_content for d in docs]
-            results = self.cohere_client.rerank(
-                model="rerank-english-v3.0",
-                query=query,
-                documents=doc_texts,
-                top_n=5
-            )
+            scores = self._rerank_scores(query, doc_texts)
+            top = sorted(range(len(doc_texts)), key=lambda i: scores[i], reverse=True)[:5]
             # Reconstruct context from top reranked results
-            final_context = "\n\n".join([doc_texts[r.index] for r in results.results])
+            final_context = "\n\n".join([doc_texts[i] for i in top])
         else:
             final_context = "\n\n".join([d.page_content for d in docs[:5]])
 
         # 3. Generate Answer
-        prompt = ChatPromptTemplate.from_template("""
-            Answer the question based ONLY on the context below.
-            The context contains timestamps in [MM:SS] format. 
-            If the user asks about a specific time or "when" something happened, use these timestamps to provide an accurate answer.
-            
-            <context>
-            {context}
-            </context>
-            
-            Question: {input}
-            
-            Answer (be concise and reference timestamps if relevant):
-        """)
-        
-        chain = prompt | self.llm
+        chain = self._get_query_chain()
         
         input_data = {"input": query, "context": final_context}
 
         if stream:
             # Define a generator function to yield text chunks
             def generate():
+                parts = []
                 for chunk in chain.stream(input_data):
                     # LangChain chunks usually have a .content attribute
-                    if hasattr(chunk, 'content'):
-                        yield chunk.content
-                    else:
-                        yield str(chunk)
+                    text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                    parts.append(text)
+                    yield text
+                if query_vec is not None:
+                    self._remember_answer(transcript_id, query_vec, "".join(parts))
             
             return generate()  # Returns the generator object
         else:
             # Standard non-streaming behavior
             response = chain.invoke(input_data)
             if hasattr(response, 'content'):
-                return response.content
+                answer = response.content
             elif isinstance(response, str):
-                return response
+                answer = response
             else:
-                return str(response)
\ No newline at end of file
+                answer = str(response)
+            if query_vec is not None:
+                self._remember_answer(transcript_id, query_vec, answer)
+            return answer
\ No newline at end of file
@@ -1,27 +1,7 @@
+import asyncio
 import streamlit as st
-from get_transcripts import gettranscripts
-import httpx
-from youtubesearchpython.core.requests import RequestCore
-from youtubesearchpython.core.constants import userAgent
-
-# Monkey patch to fix httpx compatibility issue with youtube-search-python
-def patch_youtube_search_httpx():
-    def fixed_sync_post(self):
-        if self.proxy:
-            with httpx.Client(proxies=self.proxy) as client:
-                return client.post(self.url, headers={"User-Agent": userAgent}, json=self.data, timeout=self.timeout)
-        else:
-            return httpx.post(self.url, headers={"User-Agent": userAgent}, json=self.data, timeout=self.timeout)
-    
-    def fixed_sync_get(self):
-        if self.proxy:
-            with httpx.Client(proxies=self.proxy) as client:
-                return client.get(self.url, headers={"User-Agent": userAgent}, timeout=self.timeout, cookies={'CONSENT': 'YES+1'})
-        else:
-            return httpx.get(self.url, headers={"User-Agent": userAgent}, timeout=self.timeout, cookies={'CONSENT': 'YES+1'})
-    
-    RequestCore.syncPostRequest = fixed_sync_post
-    RequestCore.syncGetRequest = fixed_sync_get
+from get_transcripts import gettranscripts, TITLE_TO_FILENAME
+from youtube_search_patch import patch_youtube_search_httpx
 
 try:
     patch_youtube_search_httpx()
@@ -32,6 +12,17 @@ from youtubesearchpython import VideosSearch
 from generate_summary import Summarize
 
 
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def search_youtube(topic: str, limit: int = 5) -> list:
+    """YouTube search results for a topic, shared across reruns and sessions for an hour."""
+    return VideosSearch(topic, limit=limit).result()["result"]
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_transcript_text(video_id: str) -> str:
+    """Formatted transcript for a video, fetched from YouTube once per process."""
+    return gettranscripts.format_transcript(gettranscripts.get_transcript(video_id))
+
 # ---------- STREAMLIT PAGE SETUP ----------
 st.set_page_config(
     page_title="Learn with YouTube AI Tutor",
@@ -48,21 +39,20 @@ if topic:
     st.write(f"🔍 Searching YouTube for: **{topic}** ...")
 
     # ---------- STEP 2: SEARCH YOUTUBE ----------
-    if "results" not in st.session_state:
-        search = VideosSearch(topic, limit=5)
-        st.session_state.results = search.result()["result"]
-
-    results = st.session_state.results
+    # Title -> result, built once per run for the radio options and the selection lookup
+    videos_by_title = {}
+    for result in search_youtube(topic):
+        videos_by_title.setdefault(result['title'], result)
     choice = st.radio(
         label="Choose a video:", 
-        options=[result['title'] for result in results],
+        options=list(videos_by_title),
         index=None
     )
 
     if not choice:
         st.error("Select a video to proceed")
     else:
-        video = next(result for result in results if result['title'] == choice)
+        video = videos_by_title[choice]
         video_title = video["title"]
         video_url = video["link"]
 
@@ -77,11 +67,10 @@ if topic:
             with st.spinner("Fetching and analyzing transcript..."):
                 try:
                     video_id = gettranscripts.extract_video_id(youtube_url)
-                    transcript = gettranscripts.get_transcript(video_id)
-                    transcript_text = gettranscripts.format_transcript(transcript)
+                    transcript_text = fetch_transcript_text(video_id)
                     title = video_title
 
-                    file_path = f"{title.replace(' ', '_').replace('?', '').replace('|', '')}.txt"
+                    file_path = f"{title.translate(TITLE_TO_FILENAME)}.txt"
                     gettranscripts.save_transcript(title, transcript_text, file_path)
 
                     st.success(f"Transcript and analysis saved to `{file_path}`")
@@ -107,7 +96,6 @@ if "transcript_text" in st.session_state:
     )
 
     if choice == "Summarize the video":
-        st.spinner("Generating summary...")
-        summary = Summarize.summarize_topic(st.session_state["transcript_text"])
-        st.markdown(summary)
+        # Render tokens as the LLM produces them; a cached summary arrives in one piece
+        st.write_stream(Summarize.stream_summary(st.session_state["transcript_text"]))
         
\ No newline at end of file
@@ -0,0 +1,138 @@
+import atexit
+import asyncio
+import functools
+import weakref
+import httpx
+
+# Shared keep-alive client so repeated searches reuse pooled TCP/TLS connections
+# instead of paying a fresh handshake on every httpx.post()/httpx.get().
+_client = None
+
+def _get_client(user_agent):
+    global _client
+    if _client is None:
+        _client = httpx.Client(headers={"User-Agent": user_agent}, timeout=30.0)
+        atexit.register(_client.close)
+    return _client
+
+@functools.lru_cache(maxsize=4)
+def _get_proxy_client(user_agent, proxy_items):
+    """Shared client for one HTTP(S)_PROXY configuration; proxy_items is the proxy dict as a tuple."""
+    client = httpx.Client(
+        headers={"User-Agent": user_agent},
+        timeout=30.0,
+        mounts={scheme: httpx.HTTPTransport(proxy=url) for scheme, url in proxy_items},
+    )
+    atexit.register(client.close)
+    return client
+
+# AsyncClient connection pools are bound to the event loop that opened them, so keep
+# one client per running loop (the FastAPI server only ever has one).
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_client(user_agent):
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(headers={"User-Agent": user_agent}, timeout=30.0)
+        _async_clients[loop] = client
+    return client
+
+# Proxied AsyncClients per running loop, keyed like _get_proxy_client by the proxy dict as a tuple.
+_async_proxy_clients = weakref.WeakKeyDictionary()
+
+def _get_async_proxy_client(user_agent, proxy_items):
+    clients = _async_proxy_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(proxy_items)
+    if client is None:
+        client = httpx.AsyncClient(
+            headers={"User-Agent": user_agent},
+            timeout=30.0,
+            mounts={scheme: httpx.AsyncHTTPTransport(proxy=url) for scheme, url in proxy_items},
+        )
+        clients[proxy_items] = client
+    return client
+
+async def aclose_async_client():
+    """Close the shared AsyncClients (plain and proxied) of the running loop, if any were opened."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    for proxied in _async_proxy_clients.pop(loop, {}).values():
+        await proxied.aclose()
+
+# Monkey patch to fix httpx compatibility issue with youtube-search-python
+# Newer httpx versions don't accept 'proxies' in post()/get() directly
+# MUST be applied before importing VideosSearch
+def patch_youtube_search_httpx():
+    """Fix httpx compatibility for youtube-search-python library."""
+    from youtubesearchpython.core.requests import RequestCore
+    from youtubesearchpython.core.constants import userAgent
+    client = _get_client(userAgent)
+    
+    def fixed_sync_post(self):
+        """Fixed syncPostRequest that works with newer httpx versions."""
+        if self.proxy:
+            return _get_proxy_client(userAgent, tuple(sorted(self.proxy.items()))).post(
+                self.url,
+                json=self.data,
+                timeout=self.timeout
+            )
+        else:
+            return client.post(
+                self.url,
+                json=self.data,
+                timeout=self.timeout
+            )
+    
+    def fixed_sync_get(self):
+        """Fixed syncGetRequest that works with newer httpx versions."""
+        if self.proxy:
+            return _get_proxy_client(userAgent, tuple(sorted(self.proxy.items()))).get(
+                self.url,
+                headers={"Cookie": "CONSENT=YES+1"},
+                timeout=self.timeout
+            )
+        else:
+            # Cookie header rather than cookies=, which httpx deprecates per request
+            # on a Client and which would otherwise leak into the shared jar.
+            return client.get(
+                self.url,
+                headers={"Cookie": "CONSENT=YES+1"},
+                timeout=self.timeout
+            )
+    
+    async def fixed_async_post(self):
+        """asyncPostRequest on a shared AsyncClient instead of a new client per search."""
+        if self.proxy:
+            return await _get_async_proxy_client(userAgent, tuple(sorted(self.proxy.items()))).post(
+                self.url,
+                json=self.data,
+                timeout=self.timeout
+            )
+        return await _get_async_client(userAgent).post(
+            self.url,
+            json=self.data,
+            timeout=self.timeout
+        )
+
+    async def fixed_async_get(self):
+        """asyncGetRequest on a shared AsyncClient instead of a new client per search."""
+        if self.proxy:
+            return await _get_async_proxy_client(userAgent, tuple(sorted(self.proxy.items()))).get(
+                self.url,
+                headers={"Cookie": "CONSENT=YES+1"},
+                timeout=self.timeout
+            )
+        return await _get_async_client(userAgent).get(
+            self.url,
+            headers={"Cookie": "CONSENT=YES+1"},
+            timeout=self.timeout
+        )
+
+    # Apply the patch
+    RequestCore.syncPostRequest = fixed_sync_post
+    RequestCore.syncGetRequest = fixed_sync_get
+    RequestCore.asyncPostRequest = fixed_async_post
+    RequestCore.asyncGetRequest = fixed_async_get
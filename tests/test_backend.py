@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import os
 
@@ -14,28 +14,30 @@ with patch('rag.rag_workflow.TranscriptRAG'):
 client = TestClient(app)
 
 def test_search_endpoint():
-    with patch('backend.main.VideosSearch') as mock_search:
-        mock_search.return_value.result.return_value = {
+    with patch('src.backend.main.VideosSearch') as mock_search:
+        mock_search.return_value.next = AsyncMock(return_value={
             "result": [{"title": "Video 1", "link": "url1"}]
-        }
+        })
         response = client.post("/search", json={"query": "test"})
         assert response.status_code == 200
         assert "results" in response.json()
         assert response.json()["results"][0]["title"] == "Video 1"
 
-def test_transcript_endpoint():
-    with patch('backend.main.gettranscripts') as mock_get:
+def test_transcript_endpoint(tmp_path):
+    with patch('src.backend.main.gettranscripts') as mock_get, \
+         patch('src.backend.main.TRANSCRIPT_DIR', str(tmp_path)):
         mock_get.extract_video_id.return_value = "vid123"
         mock_get.get_transcript.return_value = [{"text": "hello"}]
         mock_get.format_transcript.return_value = "hello"
+        mock_get.asave_transcript = AsyncMock()
         
         response = client.post("/transcript", json={"video_url": "url", "title": "title"})
         assert response.status_code == 200
         assert response.json()["transcript"] == "hello"
 
 def test_summarize_endpoint():
-    with patch('backend.main.Summarize') as mock_sum:
-        mock_sum.summarize_topic.return_value = "summary"
+    with patch('src.backend.main.Summarize') as mock_sum:
+        mock_sum.summarize_topic = AsyncMock(return_value="summary")
         response = client.post("/summarize", json={"transcript_text": "text"})
         assert response.status_code == 200
         assert response.json()["summary"] == "summary"
@@ -67,12 +69,12 @@ def test_grade_mcq_endpoint():
             assert response.json()["score"] == "5/5"
 
 def test_recommend_endpoint():
-    with patch('backend.main.transcript_rag') as mock_rag:
-        mock_rag.llm.invoke.return_value = MagicMock(content="Query 1\nQuery 2")
-        with patch('backend.main.VideosSearch') as mock_search:
-            mock_search.return_value.result.return_value = {
+    with patch('src.backend.main.transcript_rag') as mock_rag:
+        mock_rag.llm.ainvoke = AsyncMock(return_value=MagicMock(content="Query 1\nQuery 2"))
+        with patch('backend.recommendation.VideosSearch') as mock_search:
+            mock_search.return_value.next = AsyncMock(return_value={
                 "result": [{"title": "Rec 1", "link": "url1", "thumbnails": [{"url": "img"}], "channel": {"name": "ch"}}]
-            }
+            })
             response = client.post("/recommend", json={"transcript_text": "text", "summary": "sum"})
             assert response.status_code == 200
             assert "recommendations" in response.json()
@@ -1,8 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import os
+import asyncio
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -13,36 +14,121 @@ mock_search = MagicMock()
 
 with patch('rag.rag_workflow.TranscriptRAG', return_value=mock_rag):
     with patch('youtubesearchpython.VideosSearch', return_value=mock_search):
-        from backend.main import app
+        from src.backend.main import app, MAX_TRANSCRIPT_CHARS, load_transcript, store_transcript, sse_frames
 
 client = TestClient(app)
 
 def test_mindmap_endpoint():
-    with patch('backend.main.transcript_rag') as mocked_rag:
-        with patch('backend.main.MindMapService.generate_mind_map') as mock_gen:
+    with patch('src.backend.main.transcript_rag') as mocked_rag:
+        with patch('src.backend.main.MindMapService.generate_mind_map') as mock_gen:
             mock_gen.return_value = "mindmap\n  root((Test))"
             response = client.post("/mindmap", json={"transcript_text": "text"})
             assert response.status_code == 200
             assert response.json()["mind_map"] == "mindmap\n  root((Test))"
 
+def test_analyze_endpoint():
+    with patch('src.backend.main.transcript_rag') as mocked_rag:
+        with patch('src.backend.main.Summarize.summarize_topic') as mock_sum:
+            mock_sum.return_value = "summary"
+            with patch('src.backend.main.MCQService.generate_mcqs_from_text') as mock_mcq:
+                mock_mcq.return_value = {"questions": [{"id": 1}]}
+                response = client.post("/analyze", json={"transcript_text": "text"})
+                assert response.status_code == 200
+                assert response.json() == {"summary": "summary", "mcqs": [{"id": 1}]}
+
 def test_process_all_endpoint():
-    with patch('backend.main.transcript_rag') as mocked_rag:
-        with patch('backend.main.Summarize.summarize_topic') as mock_sum:
+    with patch('src.backend.main.transcript_rag') as mocked_rag, \
+         patch('src.backend.main.Summarize.summarize_topic', AsyncMock(return_value="summary")), \
+         patch('src.backend.main.MCQService.generate_mcqs_from_text', AsyncMock(return_value={"questions": []})), \
+         patch('src.backend.main.MindMapService.generate_mind_map', AsyncMock(return_value="mindmap")), \
+         patch('src.backend.main.get_recommendations', AsyncMock(return_value=[])):
+        response = client.post("/process-all", json={"transcript_text": "text"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["summary"] == "summary"
+        assert data["mcqs"] == []
+        assert data["mind_map"] == "mindmap"
+        assert data["recommendations"] == []
+
+def test_summarize_rejects_oversized_transcript():
+    with patch('src.backend.main.Summarize.summarize_topic') as mock_sum:
+        oversized = "a" * (MAX_TRANSCRIPT_CHARS + 1)
+        response = client.post("/summarize", json={"transcript_text": oversized})
+        assert response.status_code == 422
+        assert not mock_sum.called
+
+def test_summarize_uses_cached_transcript_for_video_id():
+    with patch.dict('src.backend.main.transcript_cache', {"vid123": "cached transcript"}):
+        with patch('src.backend.main.Summarize.summarize_topic') as mock_sum:
             mock_sum.return_value = "summary"
-            with patch('backend.main.MCQService.generate_mcqs_from_text') as mock_mcq:
-                mock_mcq.return_value = {"questions": []}
-                with patch('backend.main.MindMapService.generate_mind_map') as mock_mm:
-                    mock_mm.return_value = "mindmap"
-                    with patch('backend.main.get_recommendations') as mock_rec:
-                        # Make it a coroutine since it's awaited
-                        async def mock_rec_coro(*args, **kwargs):
-                            return []
-                        mock_rec.return_value = mock_rec_coro()
-                        
-                        response = client.post("/process-all", json={"transcript_text": "text"})
-                        assert response.status_code == 200
-                        data = response.json()
-                        assert data["summary"] == "summary"
-                        assert data["mcqs"] == []
-                        assert data["mind_map"] == "mindmap"
-                        assert data["recommendations"] == []
+            response = client.post("/summarize", json={"video_id": "vid123"})
+            assert response.status_code == 200
+            mock_sum.assert_called_once_with("cached transcript")
+
+def test_search_results_are_cached():
+    with patch('src.backend.main.VideosSearch') as mock_search:
+        mock_search.return_value.next = AsyncMock(return_value={
+            "result": [{"title": "Cached Video", "link": "url1"}]
+        })
+        first = client.post("/search", json={"query": "Cache Me"})
+        second = client.post("/search", json={"query": "  cache me "})
+        assert first.status_code == second.status_code == 200
+        assert second.json()["results"][0]["title"] == "Cached Video"
+        assert mock_search.call_count == 1
+
+def test_transcript_store_round_trip(tmp_path):
+    with patch('src.backend.main.TRANSCRIPT_DIR', str(tmp_path)), \
+         patch.dict('src.backend.main.transcript_cache', {}, clear=True):
+        asyncio.run(store_transcript("abcdefghijk", "[00:00] Stored transcript"))
+        assert asyncio.run(load_transcript("abcdefghijk")) == "[00:00] Stored transcript"
+        assert asyncio.run(load_transcript("missing_id1")) == ""
+        assert asyncio.run(load_transcript("../../etc/passwd")) == ""
+
+def test_sse_frames():
+    frames = list(sse_frames(iter(["Hello", "", " world\n"])))
+    assert frames == [
+        b'data: {"token":"Hello"}\n\n',
+        b'data: {"token":" world\\n"}\n\n',
+        b'data: [DONE]\n\n',
+    ]
+
+def test_transcript_endpoint_reuses_stored_transcript():
+    with patch.dict('src.backend.main.transcript_cache', {"abcdefghijk": "[00:00] Stored"}, clear=True), \
+         patch('src.backend.main.gettranscripts.get_transcript') as mock_fetch:
+        response = client.post("/transcript", json={"video_url": "https://youtu.be/abcdefghijk", "title": "t"})
+        assert response.status_code == 200
+        assert response.json() == {"transcript": "[00:00] Stored", "video_id": "abcdefghijk"}
+        mock_fetch.assert_not_called()
+
+def test_ingest_runs_on_executor():
+    import threading
+    threads = []
+    with patch('src.backend.main.transcript_rag') as mocked_rag:
+        mocked_rag.ingest_transcript.side_effect = lambda *a, **k: threads.append(threading.current_thread().name)
+        response = client.post("/ingest", json={"video_id": "vid", "transcript_text": "text"})
+        assert response.status_code == 200
+        mocked_rag.create_transcript_index.assert_called_once_with("vid")
+        assert threads and threads[0].startswith("yt-io")
+
+def test_analyze_endpoint_edge_cases():
+    with patch('src.backend.main.transcript_rag', None):
+        response = client.post("/analyze", json={"transcript_text": "text"})
+        assert response.status_code == 503
+    with patch('src.backend.main.transcript_rag'):
+        with patch('src.backend.main.Summarize.summarize_topic') as mock_sum:
+            mock_sum.return_value = "summary"
+            with patch('src.backend.main.MCQService.generate_mcqs_from_text') as mock_mcq:
+                mock_mcq.return_value = [{"id": 1}]
+                response = client.post("/analyze", json={"transcript_text": "text"})
+                assert response.status_code == 200
+                assert response.json()["mcqs"] == [{"id": 1}]
+
+def test_process_all_accepts_bare_mcq_list():
+    with patch('src.backend.main.transcript_rag'), \
+         patch('src.backend.main.Summarize.summarize_topic', AsyncMock(return_value="summary")), \
+         patch('src.backend.main.MCQService.generate_mcqs_from_text', AsyncMock(return_value=[{"id": 1}])), \
+         patch('src.backend.main.MindMapService.generate_mind_map', AsyncMock(return_value="mindmap")), \
+         patch('src.backend.main.get_recommendations', AsyncMock(return_value=[])):
+        response = client.post("/process-all", json={"transcript_text": "text"})
+        assert response.status_code == 200
+        assert response.json()["mcqs"] == [{"id": 1}]
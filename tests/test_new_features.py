@@ -1,22 +1,23 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import os
 import asyncio
 
-# Add src/backend to path
+# Add src and src/backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'backend'))
 
 from mindMap import MindMapService
-from recommendation import get_recommendations
+from recommendation import get_recommendations, cached_search, search_cache
 
 def test_mindmap_generation():
     mock_llm = MagicMock()
     mock_response = MagicMock()
     mock_response.content = "mindmap\n  root((Topic))\n    Subtopic"
-    mock_llm.invoke.return_value = mock_response
+    mock_llm.ainvoke = AsyncMock(return_value=mock_response)
     
-    result = MindMapService.generate_mind_map("Transcript text", mock_llm)
+    result = asyncio.run(MindMapService.generate_mind_map("Transcript text", mock_llm))
     assert "mindmap" in result
     assert "Topic" in result
     assert "Subtopic" in result
@@ -25,9 +26,9 @@ def test_mindmap_extraction_from_markdown():
     mock_llm = MagicMock()
     mock_response = MagicMock()
     mock_response.content = "Here is your mindmap: \n```mermaid\nmindmap\n  root((Main))\n```"
-    mock_llm.invoke.return_value = mock_response
+    mock_llm.ainvoke = AsyncMock(return_value=mock_response)
     
-    result = MindMapService.generate_mind_map("Transcript text", mock_llm)
+    result = asyncio.run(MindMapService.generate_mind_map("Transcript text", mock_llm))
     assert "mindmap" in result
     assert "Main" in result
     assert "Here is your mindmap" not in result
@@ -37,30 +38,58 @@ async def test_recommendations_parallel_search():
     mock_rag = MagicMock()
     mock_llm_response = MagicMock()
     mock_llm_response.content = "Query 1\nQuery 2\nQuery 3"
-    mock_rag.llm.invoke.return_value = mock_llm_response
-    
-    mock_executor = MagicMock()
+    mock_rag.llm.ainvoke = AsyncMock(return_value=mock_llm_response)
+    search_cache.clear()
     
     # Mock VideosSearch
     with patch('recommendation.VideosSearch') as mock_search:
-        mock_search_instance = MagicMock()
-        mock_search_instance.result.return_value = {
+        mock_search.return_value.next = AsyncMock(return_value={
             "result": [{"title": "Video 1", "link": "link1", "thumbnails": [{"url": "thumb1"}], "channel": {"name": "Chan1"}}]
-        }
-        mock_search.return_value = mock_search_instance
+        })
+        
+        recs = await get_recommendations("Transcript", "Summary", mock_rag)
         
-        # We need a real loop for run_in_executor to be called or mock it properly
-        # Since get_recommendations uses run_in_executor, we can mock the loop
-        with patch('asyncio.get_event_loop') as mock_loop:
-            mock_loop_instance = MagicMock()
-            # In Python 3.8+, run_in_executor returns a future
-            future = asyncio.Future()
-            future.set_result([{"title": "Video 1", "link": "link1", "thumbnails": [{"url": "thumb1"}], "channel": {"name": "Chan1"}}])
-            mock_loop_instance.run_in_executor.return_value = future
-            mock_loop.return_value = mock_loop_instance
-            
-            recs = await get_recommendations("Transcript", "Summary", mock_rag, mock_executor)
-            
-            assert len(recs) > 0
-            assert recs[0]["title"] == "Video 1"
-            assert mock_rag.llm.invoke.called
+        assert len(recs) > 0
+        assert recs[0]["title"] == "Video 1"
+        assert mock_rag.llm.ainvoke.called
+        # The three generated queries are searched concurrently on the event loop
+        assert mock_search.call_count == 3
+
+def test_recommendation_search_is_cached():
+    search_cache.clear()
+    with patch('recommendation.VideosSearch') as mock_search:
+        mock_search.return_value.next = AsyncMock(return_value={"result": [{"link": "link1"}]})
+        first = asyncio.run(cached_search("Linear Algebra", 2))
+        second = asyncio.run(cached_search("linear algebra", 2))
+        assert first == second == [{"link": "link1"}]
+        assert mock_search.call_count == 1
+
+def test_recommendations_drop_stalled_searches():
+    mock_rag = MagicMock()
+    mock_rag.llm.ainvoke = AsyncMock(return_value=MagicMock(content="Fast query\nStalled query"))
+    search_cache.clear()
+
+    async def fake_next(query):
+        if query == "Stalled query":
+            await asyncio.sleep(10)
+        return {"result": [{"title": query, "link": query}]}
+
+    with patch('recommendation.VideosSearch') as mock_search, \
+         patch('recommendation.RECOMMEND_SEARCH_TIMEOUT', 0.05):
+        mock_search.side_effect = lambda query, limit: MagicMock(next=lambda: fake_next(query))
+        recs = asyncio.run(get_recommendations("Transcript", "Summary", mock_rag))
+
+    assert [r["title"] for r in recs] == ["Fast query"]
+
+def test_recommendations_keep_first_seen_duplicate():
+    mock_rag = MagicMock()
+    mock_rag.llm.ainvoke = AsyncMock(return_value=MagicMock(content="First query\nSecond query"))
+    search_cache.clear()
+
+    with patch('recommendation.VideosSearch') as mock_search:
+        mock_search.side_effect = lambda query, limit: MagicMock(
+            next=AsyncMock(return_value={"result": [{"title": query, "link": "same"}]})
+        )
+        recs = asyncio.run(get_recommendations("Transcript", "Summary", mock_rag))
+
+    assert [r["title"] for r in recs] == ["First query"]
@@ -2,23 +2,33 @@ import pytest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import torch
+from types import SimpleNamespace
+from transformers import BatchEncoding
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from src.rag.rag_workflow import TranscriptRAG
+from src.rag.rag_workflow import TranscriptRAG, TruncatedEmbeddings, NomicLocalEmbeddings
 
 @pytest.fixture
 def mock_rag():
-    with patch('rag.rag_workflow.Pinecone'), \
-         patch('rag.rag_workflow.OllamaEmbeddings'), \
-         patch('rag.rag_workflow.ChatOllama'), \
-         patch('rag.rag_workflow.cohere.Client'):
+    # Patch the module TranscriptRAG is actually imported from, so no test builds real clients.
+    with patch('src.rag.rag_workflow.Pinecone'), \
+         patch('src.rag.rag_workflow.PineconeGRPC', None), \
+         patch('src.rag.rag_workflow.OllamaEmbeddings'), \
+         patch('src.rag.rag_workflow.ChatOllama'), \
+         patch('src.rag.rag_workflow.cohere.Client'):
         rag = TranscriptRAG()
-        return rag
+        # Enable Pinecone regardless of PINECONE_API_KEY so ingest/query don't return early.
+        rag.pinecone_enabled = True
+        rag.pinecone_client = rag.pinecone_client or MagicMock()
+        yield rag
 
 def test_sanitize_index_name(mock_rag):
     assert mock_rag._sanitize_index_name("Video ID 123!") == "video-id-123"
+    # One '-' per invalid character, so existing index names keep resolving
+    assert mock_rag._sanitize_index_name("transcript-dQw4_-9WgXcQ") == "transcript-dqw4--9wgxcq"
 
 def test_clean_transcript(mock_rag):
     text = "[00:00] Hello world. [00:05] This is a test."
@@ -26,7 +36,7 @@ def test_clean_transcript(mock_rag):
     assert len(sentences) == 2
     assert "[00:00] Hello world." in sentences
 
-@patch('rag.rag_workflow.ChatPromptTemplate.from_template')
+@patch('src.rag.rag_workflow.ChatPromptTemplate.from_template')
 def test_decide_chunking_strategy(mock_prompt, mock_rag):
     mock_chain = MagicMock()
     mock_chain.invoke.return_value.content = "semantic"
@@ -35,23 +45,227 @@ def test_decide_chunking_strategy(mock_prompt, mock_rag):
     strategy = mock_rag._decide_chunking_strategy("Some transcript text")
     assert strategy == "semantic"
 
-@patch('rag.rag_workflow.PineconeVectorStore')
+@patch('src.rag.rag_workflow.ChatPromptTemplate.from_template')
+def test_decide_chunking_strategy_is_cached(mock_prompt, mock_rag):
+    mock_chain = MagicMock()
+    mock_chain.invoke.return_value.content = "semantic"
+    mock_prompt.return_value.__or__.return_value = mock_chain
+    
+    assert mock_rag._decide_chunking_strategy("Some transcript text") == "semantic"
+    assert mock_rag._decide_chunking_strategy("Some transcript text") == "semantic"
+    assert mock_chain.invoke.call_count == 1
+
+@patch('src.rag.rag_workflow.PineconeVectorStore')
 def test_ingest_transcript(mock_vectorstore, mock_rag):
     mock_rag.embed_model.embed_documents.return_value = [[0.1]*768]
     mock_rag.ingest_transcript("Some text", "video_id", strategy="recursive")
     assert mock_vectorstore.called
 
-@patch('rag.rag_workflow.PineconeVectorStore.from_existing_index')
-def test_query_transcript(mock_vectorstore_existing, mock_rag):
-    mock_retriever = MagicMock()
-    mock_retriever.invoke.return_value = [MagicMock(page_content="Context text")]
-    mock_vectorstore_existing.return_value.as_retriever.return_value = mock_retriever
+def test_semantic_ingest_reuses_sentence_embeddings(mock_rag):
+    mock_rag.embed_model = MagicMock()
+    mock_rag.embed_model.embed_documents.return_value = [[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]]
+    mock_rag.pinecone_enabled = True
+    mock_rag.pinecone_client = MagicMock()
+    mock_rag.graph_enabled = False
+    
+    mock_rag.ingest_transcript("[00:00] One. [00:05] Two. [00:10] Three.", "video_id", strategy="semantic")
+    
+    assert mock_rag.embed_model.embed_documents.call_count == 1
+    vectors = mock_rag.pinecone_client.Index.return_value.upsert.call_args.kwargs["vectors"]
+    assert [v[1] for v in vectors] == [[1.0, 0.0], [0.0, 1.0]]
+    assert vectors[0][2]["text"] == "[00:00] One. [00:05] Two."
+
+def test_semantic_chunking_keeps_batch_order_when_concurrent(mock_rag):
+    mock_rag.embed_model = MagicMock()
+    mock_rag.embed_model.embed_documents.side_effect = lambda batch: [[float(len(s)), 1.0] for s in batch]
+    mock_rag.embed_concurrency = 4
+    sentences = ["a" * n for n in range(6, 206)]
+    
+    with patch('src.rag.rag_workflow.EMBED_BATCH_SIZE', 32):
+        chunks, embeddings = mock_rag._semantic_chunking(sentences, threshold=1.1)
+    
+    assert chunks == sentences
+    assert mock_rag.embed_model.embed_documents.call_count == 7
+    assert [round(e[0] / e[1]) for e in embeddings] == [len(s) for s in sentences]
+
+def test_reingesting_same_transcript_is_skipped(mock_rag):
+    mock_rag.embed_model = MagicMock()
+    mock_rag.embed_model.embed_documents.return_value = [[1.0, 0.0], [0.0, 1.0]]
+    mock_rag.pinecone_enabled = True
+    mock_rag.pinecone_client = MagicMock()
+    mock_rag.graph_enabled = False
+    
+    mock_rag.ingest_transcript("[00:00] One more. [00:05] Two more.", "video_id", strategy="semantic")
+    mock_rag.ingest_transcript("[00:00] One more. [00:05] Two more.", "video_id", strategy="semantic")
+    
+    assert mock_rag.embed_model.embed_documents.call_count == 1
+    assert mock_rag.pinecone_client.Index.return_value.upsert.call_count == 1
+
+    # A different strategy re-chunks the same transcript, so it is not skipped.
+    with patch('src.rag.rag_workflow.PineconeVectorStore') as mock_vectorstore:
+        mock_rag.ingest_transcript("[00:00] One more. [00:05] Two more.", "video_id", strategy="recursive")
+    assert mock_vectorstore.return_value.add_documents.called
+
+@patch('src.rag.rag_workflow.PineconeVectorStore')
+def test_query_transcript(mock_vectorstore, mock_rag):
+    mock_vectorstore.return_value.similarity_search_by_vector_with_score.return_value = [(MagicMock(page_content="Context text"), 0.5)]
     
     # Mock the LLM chain for query_transcript
     mock_chain = MagicMock()
     mock_chain.invoke.return_value.content = "The answer."
     
-    with patch('rag.rag_workflow.ChatPromptTemplate.from_template') as mock_prompt:
+    with patch('src.rag.rag_workflow.ChatPromptTemplate.from_template') as mock_prompt:
         mock_prompt.return_value.__or__.return_value = mock_chain
         answer = mock_rag.query_transcript("video_id", "What is the answer?", use_reranker=False)
         assert answer == "The answer."
+    assert mock_vectorstore.return_value.similarity_search_by_vector_with_score.called
+
+def test_query_skips_rerank_for_small_candidate_sets(mock_rag):
+    mock_rag.graph_enabled = True
+    mock_rag._graph_retrieve_chunks = MagicMock(return_value=[MagicMock(page_content="A"), MagicMock(page_content="B")])
+    mock_rag._embed_query = MagicMock(return_value=[0.1, 0.2])
+    mock_rag.cohere_client = MagicMock()
+    mock_rag._query_chain = MagicMock()
+    mock_rag._query_chain.invoke.return_value.content = "The answer."
+    
+    assert mock_rag.query_transcript("video_id", "What is the answer?") == "The answer."
+    mock_rag.cohere_client.rerank.assert_not_called()
+    assert mock_rag._query_chain.invoke.call_args.args[0]["context"] == "A\n\nB"
+
+def test_dedupe_chunks_ignores_timestamps(mock_rag):
+    from langchain_core.documents import Document
+    chunks = [
+        Document(page_content="[00:10] Thanks for watching."),
+        Document(page_content="[02:15] Something else."),
+        Document(page_content="[12:40]  thanks for watching."),
+    ]
+    
+    deduped, embeddings = mock_rag._dedupe_chunks(chunks, [[1.0], [2.0], [3.0]])
+    
+    assert [c.page_content for c in deduped] == ["[00:10] Thanks for watching.", "[02:15] Something else."]
+    assert embeddings == [[1.0], [2.0]]
+
+def test_create_transcript_index_waits_for_ready(mock_rag):
+    mock_rag.pinecone_client = MagicMock()
+    mock_rag.pinecone_client.list_indexes.return_value = []
+    mock_rag.pinecone_client.describe_index.side_effect = [
+        MagicMock(status=MagicMock(ready=False)),
+        MagicMock(status=MagicMock(ready=True)),
+    ]
+    
+    with patch('src.rag.rag_workflow.time.sleep') as mock_sleep:
+        index_name = mock_rag.create_transcript_index("video_id")
+    
+    assert index_name == "transcript-video-id"
+    assert mock_rag.pinecone_client.describe_index.call_count == 2
+    mock_sleep.assert_called_once_with(0.2)
+    assert mock_rag._index_exists("transcript-video-id")
+
+def test_rerank_scores_are_cached_per_document(mock_rag):
+    mock_rag.cohere_client = MagicMock()
+    mock_rag.cohere_client.rerank.return_value.results = [
+        MagicMock(index=1, relevance_score=0.9),
+        MagicMock(index=0, relevance_score=0.2),
+    ]
+    
+    assert mock_rag._rerank_scores("query", ["A", "B"]) == [0.2, 0.9]
+    
+    mock_rag.cohere_client.rerank.return_value.results = [MagicMock(index=0, relevance_score=0.5)]
+    assert mock_rag._rerank_scores("query", ["B", "C"]) == [0.9, 0.5]
+    assert mock_rag.cohere_client.rerank.call_args.kwargs["documents"] == ["C"]
+
+def test_vectorstore_is_reused_per_index(mock_rag):
+    with patch('src.rag.rag_workflow.PineconeVectorStore') as mock_vectorstore:
+        first = mock_rag._get_vectorstore("transcript-a")
+        second = mock_rag._get_vectorstore("transcript-a")
+        mock_rag._get_vectorstore("transcript-b")
+    
+    assert first is second
+    assert mock_vectorstore.call_count == 2
+
+def test_query_skips_rerank_on_confident_retrieval(mock_rag):
+    mock_rag.graph_enabled = False
+    mock_rag.pinecone_client = MagicMock()
+    mock_rag._known_indexes.add("transcript-video-id")
+    mock_rag._embed_query = MagicMock(return_value=[0.1, 0.2])
+    vectorstore = MagicMock()
+    vectorstore.similarity_search_by_vector_with_score.return_value = [
+        (MagicMock(page_content=f"Doc {i}"), 0.9 - i / 100) for i in range(15)
+    ]
+    mock_rag._get_vectorstore = MagicMock(return_value=vectorstore)
+    mock_rag.cohere_client = MagicMock()
+    mock_rag._query_chain = MagicMock()
+    mock_rag._query_chain.invoke.return_value.content = "The answer."
+    
+    assert mock_rag.query_transcript("video_id", "What is the answer?") == "The answer."
+    mock_rag.cohere_client.rerank.assert_not_called()
+    assert mock_rag._query_chain.invoke.call_args.args[0]["context"].startswith("Doc 0\n\nDoc 1")
+
+def test_index_exists_is_cached(mock_rag):
+    index = MagicMock()
+    index.name = "transcript-video-id"
+    mock_rag.pinecone_client = MagicMock()
+    mock_rag.pinecone_client.list_indexes.return_value = [index]
+    
+    assert mock_rag._index_exists("transcript-video-id")
+    assert mock_rag._index_exists("transcript-video-id")
+    assert mock_rag.pinecone_client.list_indexes.call_count == 1
+
+def test_query_embedding_is_cached(mock_rag):
+    mock_rag.embed_model = MagicMock()
+    mock_rag.embed_model.embed_query.return_value = [0.1, 0.2]
+    
+    assert mock_rag._embed_query("What is the answer?") == [0.1, 0.2]
+    assert mock_rag._embed_query("What is the answer?") == [0.1, 0.2]
+    assert mock_rag.embed_model.embed_query.call_count == 1
+
+def test_truncated_embeddings_are_renormalized():
+    base = MagicMock()
+    base.embed_documents.return_value = [[3.0, 4.0, 12.0], [0.0, 2.0, 5.0]]
+    base.embed_query.return_value = [3.0, 4.0, 12.0]
+    embeddings = TruncatedEmbeddings(base, dimensions=2)
+    
+    docs = embeddings.embed_documents(["a", "b"])
+    assert docs[0] == pytest.approx([0.6, 0.8])
+    assert docs[1] == pytest.approx([0.0, 1.0])
+    assert embeddings.embed_query("a") == pytest.approx([0.6, 0.8])
+
+def test_nomic_local_embeddings_keep_input_order():
+    def tokenizer(texts, **kwargs):
+        # One fake token per text whose value is the text length, plus a padded slot
+        ids = torch.tensor([[float(len(t)), 0.0] for t in texts])
+        mask = torch.tensor([[1, 0] for _ in texts])
+        return BatchEncoding({"input_ids": ids, "attention_mask": mask})
+    
+    model = MagicMock()
+    model.device = "cpu"
+    model.side_effect = lambda input_ids, attention_mask: SimpleNamespace(
+        last_hidden_state=torch.stack([input_ids, torch.ones_like(input_ids)], dim=-1)
+    )
+    embeddings = NomicLocalEmbeddings(model=model, tokenizer=tokenizer)
+    
+    texts = ["a much longer document", "short", "mid length"]
+    vectors = embeddings.embed_documents(texts)
+    
+    for text, vector in zip(texts, vectors):
+        length = len("search_document: " + text)
+        norm = (length ** 2 + 1) ** 0.5
+        assert vector == pytest.approx([length / norm, 1 / norm])
+
+def test_paraphrased_question_reuses_answer(mock_rag):
+    mock_rag.graph_enabled = True
+    mock_rag._graph_retrieve_chunks = MagicMock(return_value=[MagicMock(page_content="A")])
+    vectors = {"What is X?": [1.0, 0.0], "what is x": [0.99, 0.01], "Who made Y?": [0.0, 1.0]}
+    mock_rag._embed_query = MagicMock(side_effect=lambda q: vectors[q])
+    mock_rag._query_chain = MagicMock()
+    mock_rag._query_chain.invoke.return_value.content = "X is a letter."
+
+    assert mock_rag.query_transcript("video_id", "What is X?") == "X is a letter."
+    assert mock_rag.query_transcript("video_id", "what is x") == "X is a letter."
+    assert list(mock_rag.query_transcript("video_id", "what is x", stream=True)) == ["X is a letter."]
+    assert mock_rag._query_chain.invoke.call_count == 1
+
+    # Unrelated questions and other transcripts still go through retrieval
+    mock_rag.query_transcript("video_id", "Who made Y?")
+    mock_rag.query_transcript("other_video", "What is X?")
+    assert mock_rag._query_chain.invoke.call_count == 3
@@ -1,12 +1,13 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
 import sys
 import os
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from get_transcripts import gettranscripts
+from get_transcripts import gettranscripts, TITLE_TO_FILENAME
 from generate_summary import Summarize
 from mcq_service import MCQService
 
@@ -16,6 +17,9 @@ def test_extract_video_id():
     
     url_short = "https://youtu.be/dQw4w9WgXcQ"
     assert gettranscripts.extract_video_id(url_short) == "dQw4w9WgXcQ"
+    
+    for url in ("https://www.youtube.com/embed/dQw4w9WgXcQ", "https://youtube.com/shorts/dQw4w9WgXcQ?feature=share"):
+        assert gettranscripts.extract_video_id(url) == "dQw4w9WgXcQ"
 
 @patch('get_transcripts.YouTubeTranscriptApi')
 def test_get_transcript(mock_api):
@@ -36,21 +40,78 @@ def test_format_transcript():
     formatted = gettranscripts.format_transcript(transcript)
     assert "[00:00] Hello" in formatted
 
-@patch('generate_summary.client.chat.completions.create')
-def test_summarize_topic(mock_create):
-    mock_response = MagicMock()
-    mock_response.choices[0].message.content = "This is a summary."
-    mock_create.return_value = mock_response
+def test_save_transcript(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gettranscripts.save_transcript("Title", "[00:00] Hello", "out.txt")
+    asyncio.run(gettranscripts.asave_transcript("Title", "[00:00] Hello", "async.txt"))
+    
+    for name in ("out.txt", "async.txt"):
+        saved = (tmp_path / "transcripts" / name).read_text(encoding="utf-8")
+        assert saved == "Title\n\nTranscript with Timestamps\n\n[00:00] Hello"
+    # Written via a temp file that is renamed into place, so none is left behind
+    assert sorted(p.name for p in (tmp_path / "transcripts").iterdir()) == ["async.txt", "out.txt"]
+
+def test_title_to_filename():
+    assert "Intro to ML | Part 1?".translate(TITLE_TO_FILENAME) == "Intro_to_ML__Part_1"
+    assert "AC/DC: Live".translate(TITLE_TO_FILENAME) == "AC_DC__Live"
+
+@patch('generate_summary.ChatOllama')
+def test_summarize_topic(mock_chat):
+    mock_chat.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="This is a summary."))
     
-    summary = Summarize.summarize_topic("Some transcript text")
+    summary = asyncio.run(Summarize.summarize_topic("Some transcript text"))
     assert summary == "This is a summary."
+    assert "Some transcript text" in mock_chat.return_value.ainvoke.call_args.args[0]
 
-@patch('mcq_service.hf_client.chat_completion')
-def test_generate_mcqs(mock_chat):
-    mock_response = MagicMock()
-    mock_response.choices[0].message.content = '{"questions": [{"id": 1, "question": "What?", "options": ["A", "B"]}]}'
-    mock_chat.return_value = mock_response
+@patch('generate_summary.ChatOllama')
+def test_summarize_topic_is_cached(mock_chat):
+    mock_chat.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Cached summary."))
+    
+    first = asyncio.run(Summarize.summarize_topic("Transcript to cache"))
+    second = asyncio.run(Summarize.summarize_topic("Transcript to cache"))
+    assert first == second == "Cached summary."
+    assert mock_chat.return_value.ainvoke.call_count == 1
+
+@patch('generate_summary.ChatOllama')
+def test_stream_summary_yields_chunks(mock_chat):
+    async def fake_stream(prompt):
+        for text in ["Part one. ", "Part two."]:
+            yield MagicMock(content=text)
+    mock_chat.return_value.astream = fake_stream
+    
+    async def collect():
+        return [chunk async for chunk in Summarize.stream_summary("Transcript to stream")]
     
-    mcqs = MCQService.generate_mcqs_from_text("Some text")
+    assert asyncio.run(collect()) == ["Part one. ", "Part two."]
+    # The streamed summary is cached for the non-streaming endpoint.
+    assert asyncio.run(Summarize.summarize_topic("Transcript to stream")) == "Part one. Part two."
+
+def test_generate_mcqs():
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(return_value=MagicMock(
+        content='{"questions": [{"id": 1, "question": "What?", "options": ["A", "B"]}]}'
+    ))
+    
+    mcqs = asyncio.run(MCQService.generate_mcqs_from_text("Some text", mock_llm))
     assert "questions" in mcqs
     assert mcqs["questions"][0]["question"] == "What?"
+    assert mock_llm.ainvoke.call_args.kwargs["format"] == "json"
+
+def test_generate_mcqs_strips_fences_and_thinking():
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(return_value=MagicMock(
+        content='<think>planning</think>\n```json\n{"questions": [{"id": 1, "question": "Why?", "options": ["A", "B"]}]}\n```'
+    ))
+    
+    mcqs = asyncio.run(MCQService.generate_mcqs_from_text("Some text", mock_llm))
+    assert mcqs["questions"][0]["question"] == "Why?"
+    assert mock_llm.ainvoke.call_args.kwargs["format"] == "json"
+
+def test_generate_mcqs_ignores_prose_after_json():
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(return_value=MagicMock(
+        content='Here you go: {"questions": [{"id": 1, "question": "Use {braces}?", "options": ["A", "B"]}]} Hope that {helps}!'
+    ))
+
+    mcqs = asyncio.run(MCQService.generate_mcqs_from_text("Some text", mock_llm))
+    assert mcqs["questions"][0]["question"] == "Use {braces}?"